@@ -1,12 +1,21 @@
 """ Admin routes """
 from datetime import datetime, timedelta
 import sqlite3
+import time
+from typing import Annotated
 
-from fastapi import APIRouter, Depends, Request
-from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Depends, Form, HTTPException, Request
+from fastapi.responses import FileResponse, RedirectResponse
+from fastapi.routing import APIRoute
 
-from app.dependencies import requires_admin
+from app.core.busy_retry import busy_retry
+from app.core.cache import calendar_cache, session_cache
+from app.core.flags import FLAG_NAMES, runtime_flags
+from app.core.instrumentation import route_metrics
+from app.core.profiling import PROFILE_COOKIE, PROFILE_PARAM, profile_store
+from app.core.slow_queries import slow_query_log
+from app.core.template_utils import templates
+from app.dependencies import get_db, requires_admin
 from app.viewmodels.signins import SigninRow
 
 router = APIRouter(
@@ -15,12 +24,11 @@ router = APIRouter(
 
 )
 
-templates = Jinja2Templates(directory="templates")
-
 
 def index(
     request: Request,
-    current_user=Depends(requires_admin)
+    current_user=Depends(requires_admin),
+    conn: sqlite3.Connection = Depends(get_db),
 ):
     """Returns admin section home page"""
     if not current_user:
@@ -34,13 +42,39 @@ def index(
         name="admin/admin-home.html",
         context={
             "current_user": current_user,
+            "cache_stats": {
+                "Sessions": session_cache.stats(),
+                "Calendar months": calendar_cache.stats(),
+            },
+            "flags": runtime_flags.snapshot(),
         }
     )
 
 
+def update_flag(
+    request: Request,
+    name: str,
+    value: Annotated[bool, Form()],
+    current_user=Depends(requires_admin),
+    conn: sqlite3.Connection = Depends(get_db),
+):
+    """Switches a runtime flag on or off for every worker"""
+    if not current_user:
+        response = RedirectResponse(status_code=303, url="/")
+        if request.cookies.get("session-id"):
+            response.delete_cookie("session-id")
+        return response
+
+    if name in FLAG_NAMES:
+        runtime_flags.set(conn=conn, name=name, on=value)
+
+    return RedirectResponse(status_code=303, url="/admin")
+
+
 def users(
     request: Request,
-    current_user=Depends(requires_admin)
+    current_user=Depends(requires_admin),
+    conn: sqlite3.Connection = Depends(get_db),
 ):
     """List users"""
     if not current_user:
@@ -49,11 +83,10 @@ def users(
             response.delete_cookie("session-id")
         return response
     
-    with sqlite3.connect("db.sqlite3") as conn:
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, display_name, email, username FROM users;")
-        rows = cursor.fetchall()
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    cursor.execute("SELECT id, display_name, email, username FROM users;")
+    rows = cursor.fetchall()
 
     headings = ["Display name", "Email", "Username", "Actions"]
 
@@ -73,7 +106,8 @@ def users(
 
 def signins(
     request: Request,
-    current_user=Depends(requires_admin)
+    current_user=Depends(requires_admin),
+    conn: sqlite3.Connection = Depends(get_db),
 ):
     """List users"""
     if not current_user:
@@ -82,16 +116,15 @@ def signins(
             response.delete_cookie("session-id")
         return response
 
-    with sqlite3.connect("db.sqlite3") as conn:
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("""
-                       SELECT signins.created_at, signins.status, users.id as user_id, users.display_name 
-                       FROM user_signins as signins 
-                       JOIN users ON users.id = signins.user_id 
-                       ORDER BY signins.created_at DESC;
-                       """)
-        rows = cursor.fetchall()
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    cursor.execute("""
+                   SELECT signins.created_at, signins.status, users.id as user_id, users.display_name 
+                   FROM user_signins as signins 
+                   JOIN users ON users.id = signins.user_id 
+                   ORDER BY signins.created_at DESC;
+                   """)
+    rows = cursor.fetchall()
 
     signin_rows = []
     for row in rows:
@@ -113,3 +146,125 @@ def signins(
         name="admin/user-signins.html",
         context=context
     )
+
+
+def metrics(
+    request: Request,
+    current_user=Depends(requires_admin),
+):
+    """Per-route latency, throughput, errors and SQL counts for this worker"""
+    if not current_user:
+        response = RedirectResponse(status_code=303, url="/")
+        if request.cookies.get("session-id"):
+            response.delete_cookie("session-id")
+        return response
+
+    # every route in the route table, then anything else that was requested
+    route_names = [
+        f"{method} {route.path}"
+        for route in request.app.routes if isinstance(route, APIRoute)
+        for method in sorted(route.methods)
+    ]
+    route_names += [name for name in route_metrics.routes() if name not in route_names]
+
+    context = {
+        "current_user": current_user,
+        "routes": {name: route_metrics.summary(route=name) for name in route_names},
+        "uptime_seconds": int(time.monotonic() - route_metrics.started_at),
+        "busy_retries": busy_retry.stats(),
+    }
+
+    return templates.TemplateResponse(
+        request=request,
+        name="admin/metrics.html",
+        context=context
+    )
+
+
+def slow_queries(
+    request: Request,
+    current_user=Depends(requires_admin),
+):
+    """Latest entries of the slow query log, newest first"""
+    if not current_user:
+        response = RedirectResponse(status_code=303, url="/")
+        if request.cookies.get("session-id"):
+            response.delete_cookie("session-id")
+        return response
+
+    context = {
+        "current_user": current_user,
+        "entries": slow_query_log.tail(),
+        "threshold_ms": slow_query_log.threshold_ms,
+    }
+
+    return templates.TemplateResponse(
+        request=request,
+        name="admin/slow-queries.html",
+        context=context
+    )
+
+
+def profiles(
+    request: Request,
+    current_user=Depends(requires_admin),
+):
+    """Saved request profiles, newest first"""
+    if not current_user:
+        response = RedirectResponse(status_code=303, url="/")
+        if request.cookies.get("session-id"):
+            response.delete_cookie("session-id")
+        return response
+
+    context = {
+        "current_user": current_user,
+        "profiles": profile_store.list(),
+        "profile_param": PROFILE_PARAM,
+        "cookie_on": request.cookies.get(PROFILE_COOKIE) == "1",
+    }
+
+    return templates.TemplateResponse(
+        request=request,
+        name="admin/profiles.html",
+        context=context
+    )
+
+
+def update_profile_cookie(
+    request: Request,
+    value: Annotated[bool, Form()],
+    current_user=Depends(requires_admin),
+):
+    """Switches profiling of every request from this browser on or off"""
+    if not current_user:
+        response = RedirectResponse(status_code=303, url="/")
+        if request.cookies.get("session-id"):
+            response.delete_cookie("session-id")
+        return response
+
+    response = RedirectResponse(status_code=303, url="/admin/profiles")
+    if value:
+        response.set_cookie(key=PROFILE_COOKIE, value="1", httponly=True, samesite="lax")
+    else:
+        response.delete_cookie(PROFILE_COOKIE)
+
+    return response
+
+
+def download_profile(
+    request: Request,
+    name: str,
+    current_user=Depends(requires_admin),
+):
+    """Downloads one saved profile as a pstats file"""
+    if not current_user:
+        response = RedirectResponse(status_code=303, url="/")
+        if request.cookies.get("session-id"):
+            response.delete_cookie("session-id")
+        return response
+
+    path = profile_store.path_for(name=name)
+    if not path:
+        raise HTTPException(status_code=404)
+
+    return FileResponse(path=path, filename=name, media_type="application/octet-stream")
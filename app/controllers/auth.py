@@ -10,8 +10,10 @@ from fastapi import APIRouter, Depends, Form, Request, Response
 from fastapi.responses import RedirectResponse
 
 from app.auth import auth_service
+from app.core.busy_retry import execute_write
 from app.core.template_utils import templates
-from app.dependencies import requires_guest, requires_user
+from app.core.write_queue import end_read_transaction, write_queue
+from app.dependencies import get_db, requires_guest, requires_user
 from app.models.session import Session
 from app.viewmodels.session import SessionCreate
 from app.viewmodels.structs import UserLoginRow, UserRow
@@ -72,6 +74,7 @@ def signup(
     username: Annotated[str, Form()],
     password: Annotated[str, Form()],
     current_user=Depends(requires_guest),
+    conn: sqlite3.Connection = Depends(get_db),
     ):
     """Sign up a user"""
     # check if user exists
@@ -103,11 +106,9 @@ def signup(
         context.update({"password_error": "Password must be at least 8 characters long."})
 
     # check if email already exists for this app
-    with sqlite3.connect("db.sqlite3") as conn:
-        conn.execute("PRAGMA foreign_keys=ON;")
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, display_name, email, is_admin, birthday, username FROM users WHERE email = ?", (email, ))
-        user_row = cursor.fetchone()
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, display_name, email, is_admin, birthday, username FROM users WHERE email = ?", (email, ))
+    user_row = cursor.fetchone()
 
     if user_row:
         context.update({"form_error": "Invalid email or password"})
@@ -122,11 +123,8 @@ def signup(
     # Hash password
     hashed_password = auth_service.get_password_hash(password)
     
-    with sqlite3.connect("db.sqlite3") as conn:
-        conn.execute("PRAGMA foreign_keys=ON;")
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (email, hashed_password) VALUES (?, ?);", (email, hashed_password))
-        new_user_id = cursor.lastrowid
+    cursor = execute_write(conn=conn, sql="INSERT INTO users (email, hashed_password) VALUES (?, ?);", params=(email, hashed_password))
+    new_user_id = cursor.lastrowid
 
     token = str(uuid.uuid4())
     expires_at = int(time.time()) + 3600
@@ -136,7 +134,7 @@ def signup(
         user_id=new_user_id,
         expires_at=expires_at
     )
-    Session.create(data=session_create)
+    Session.create(conn=conn, data=session_create)
     
     response = Response(status_code=200)
     response.set_cookie(
@@ -153,12 +151,20 @@ def signup(
     return response
 
 
+def record_signin(conn: sqlite3.Connection, data: SessionCreate):
+    """Stores the new session and the successful sign in, run on the write queue"""
+    Session.create(conn=conn, data=data)
+
+    execute_write(conn=conn, sql="INSERT INTO user_signins (user_id, status) VALUES (?, ?);", params=(data.user_id, "SUCCESS"))
+
+
 def signin(
     request: Request,
     response: Response,
     username: Annotated[str, Form()],
     password: Annotated[str, Form()],
     current_user=Depends(requires_guest),
+    conn: sqlite3.Connection = Depends(get_db),
     ):
     """Sign in a user"""
     current_time = datetime.datetime.now()
@@ -181,15 +187,13 @@ def signin(
         "previous_password": password
     }
     # check if email already exists for this app
-    with sqlite3.connect("db.sqlite3") as conn:
-        conn.execute("PRAGMA foreign_keys=ON;")
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, display_name, email, is_admin, birthday, username, hashed_password FROM users WHERE email = ?", (email, ))
-        user_row = cursor.fetchone()
-        if user_row:
-            current_user = UserLoginRow(*user_row)
-        else:
-            context.update({"form_error": "Invalid email or password"})
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, display_name, email, is_admin, birthday, username, hashed_password FROM users WHERE email = ?", (email, ))
+    user_row = cursor.fetchone()
+    if user_row:
+        current_user = UserLoginRow(*user_row)
+    else:
+        context.update({"form_error": "Invalid email or password"})
 
     
     # need to check if password is correct
@@ -214,11 +218,9 @@ def signin(
         
         return response
 
-    with sqlite3.connect("db.sqlite3") as conn:
-        conn.execute("PRAGMA foreign_keys=ON;")
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, display_name, email, is_admin, birthday, username FROM users WHERE email = ?", (email, ))
-        current_user = UserRow(*cursor.fetchone())
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, display_name, email, is_admin, birthday, username FROM users WHERE email = ?", (email, ))
+    current_user = UserRow(*cursor.fetchone())
 
     token = str(uuid.uuid4())
     expires_at = int(time.time()) + 3600
@@ -228,12 +230,8 @@ def signin(
         user_id=current_user.id,
         expires_at=expires_at
     )
-    Session.create(data=session_create)
-
-    with sqlite3.connect("db.sqlite3") as conn:
-        conn.execute("PRAGMA foreign_keys = ON;")
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO user_signins (user_id, status) VALUES (?, ?);", (current_user.id, "SUCCESS"))
+    end_read_transaction(conn=conn)
+    write_queue.execute(record_signin, data=session_create)
     
     response = Response(status_code=200)
     response.set_cookie(
@@ -253,6 +251,7 @@ def signin(
 def signout(
         request: Request, 
         current_user=Depends(requires_user),
+        conn: sqlite3.Connection = Depends(get_db),
         ):
     """Sign out a user"""
     if not current_user:
@@ -263,11 +262,11 @@ def signout(
         
     session_id = request.cookies.get("session-id")
 
-    db_session = Session.get_by_token(token=session_id)
+    db_session = Session.get_by_token(conn=conn, token=session_id)
     if not db_session:
         return RedirectResponse(status_code=303, url="/")
     
-    db_session.delete()
+    db_session.delete(conn=conn)
 
     if request.headers.get("hx-request"):
         response = Response(status_code=200, headers={"hx-redirect": "/signin"})
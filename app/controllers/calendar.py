@@ -1,6 +1,7 @@
 """
 Calendar related routes
 """
+import sqlite3
 from typing import Annotated, Optional
 
 from fastapi import Depends, Request, Response
@@ -8,7 +9,7 @@ from fastapi import Depends, Request, Response
 from app.core.template_utils import templates
 from app.core.config import get_settings
 from app.handlers.calendar.get_calendar import get_calendar
-from app.dependencies import requires_user
+from app.dependencies import get_db, requires_user
 from app.viewmodels.user import CurrentUser
 
 settings = get_settings()
@@ -19,11 +20,12 @@ def month(
     year: int,
     day: Optional[int] = None,
     current_user=Depends(requires_user),
+    conn: sqlite3.Connection = Depends(get_db),
 ):  
     if not day:
         day = None
 
-    return get_calendar(request=request, year=year, month=month, day=day, current_user=current_user)
+    return get_calendar(request=request, year=year, month=month, day=day, current_user=current_user, conn=conn)
 
 
 def day(
@@ -32,11 +34,12 @@ def day(
     year: int,
     day: int,
     current_user=Depends(requires_user),
+    conn: sqlite3.Connection = Depends(get_db),
 ):
     if not day:
         day = None
 
-    return get_calendar(request=request, year=year, month=month, day=day, current_user=current_user)
+    return get_calendar(request=request, year=year, month=month, day=day, current_user=current_user, conn=conn)
 
 
 def edit(
@@ -45,11 +48,12 @@ def edit(
     year: int,
     day: int,
     current_user=Depends(requires_user),
+    conn: sqlite3.Connection = Depends(get_db),
 ):
     if not day:
         day = None
 
-    return get_calendar(request=request, year=year, month=month, day=day, current_user=current_user)
+    return get_calendar(request=request, year=year, month=month, day=day, current_user=current_user, conn=conn)
 
 def birthday_greeting(
         request: Request,
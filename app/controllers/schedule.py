@@ -1,23 +1,28 @@
-import sqlite3
 import datetime
+import sqlite3
 from typing import Annotated
 
 from fastapi import Depends, Request
 from fastapi.responses import Response, RedirectResponse
 
 from app.core.template_utils import templates
-from app.dependencies import requires_schedule_owner, requires_user
+from app.core.write_queue import end_read_transaction, write_queue
+from app.dependencies import get_db, requires_user
 from app.models.commitment import Commitment
 from app.models.shift import Shift
-from app.services import calendar_service
+from app.services import calendar_service, etags
 from app.viewmodels.pages import NoShiftBtn, ScheduleMonthPage, YesShiftBtn
 from app.viewmodels.structs import ShiftRow
 from app.viewmodels.user import CurrentUser
 
+# a year of days at most per bulk request
+MAX_BULK_DAYS = 366
+
 
 def index(
     request: Request,
     current_user=Depends(requires_user),
+    conn: sqlite3.Connection = Depends(get_db),
 ):
     if not current_user:
         if request.headers.get("hx-request"):
@@ -44,6 +49,7 @@ def month(
     year: int,
     month: int,
     current_user=Depends(requires_user),
+    conn: sqlite3.Connection = Depends(get_db),
 ):
     if not current_user:
         if request.headers.get("hx-request"):
@@ -55,76 +61,59 @@ def month(
     
     current_date = datetime.date(year=year, month=month, day=1)
 
-    prev_month_name, next_month_name = calendar_service.get_prev_and_next_month_names(
-        current_month=month)
-
-    month_calendar = calendar_service.get_month_date_list(year=year, month=month)
-
-    # calendar_date_list is a list of dictionaries
-    # the keys are date_strings to make matching shifts easier
-    # ie; "2021-09-01": datetime.date()
-    calendar_date_list = {}
-
-    # because month calendar year/month/day are numbers
-    # numbers less than 10 don't have preceeding 0's to match the formatting of
-    # the date strings, need to add 0's to the front of the numbers
-    for date in month_calendar:
-        year_string = f"{date[0]}"
-        month_string = f"{date[1]}"
-        day_string = f"{date[2]}"
-        if date[1] < 10:
-            month_string = f"0{date[1]}"
-        if date[2] < 10:
-            day_string = f"0{date[2]}"
-        
-        date_object = datetime.date(year=date[0], month=date[1], day=date[2])
-        date_dict = {
-            f"{year_string}-{month_string}-{day_string}": date_object
-        }
-        if date[1] == month:
-            calendar_date_list.update(date_dict)
+    # answered from the data versions alone, without loading schedules or rendering
+    is_fragment = bool(request.headers.get("HX-Request"))
+    etag = etags.make_etag(conn=conn, user_id=current_user.id, variant=("scheduling", year, month, is_fragment))
+    headers = etags.conditional_headers(etag=etag)
+    if etags.is_not_modified(request=request, etag=etag):
+        return etags.not_modified_response(headers=headers)
+
+    # shared, precomputed grid, month_dates maps ISO keys to the days of the month
+    month_grid = calendar_service.get_month_grid(year=year, month=month)
 
     # get the start and end of the month for query filters
     start_of_month = calendar_service.get_start_of_month(year=year, month=month)
     end_of_month = calendar_service.get_end_of_month(year=year, month=month)  
 
-    db_shifts = Shift.list_user_shifts(user_id=current_user.id)
-    db_commitments = Commitment.list_month_for_user(start_of_month=start_of_month, end_of_month=end_of_month, user_id=current_user.id)
+    db_shifts = Shift.list_user_shifts(conn=conn, user_id=current_user.id)
+    db_commitments = Commitment.list_month_for_user(conn=conn, start_of_month=start_of_month, end_of_month=end_of_month, user_id=current_user.id)
 
     # repackage schedule as dict with dates as .get() accessible keys
     commitments = {}
     for commitment in db_commitments:
-        date_key = commitment.date.strftime("%Y-%m-%d")
         shift_id = commitment.shift_id
-        commitments.setdefault(date_key, {})[shift_id] = commitment
+        commitments.setdefault(commitment.day, {})[shift_id] = commitment
 
     context = ScheduleMonthPage(
         current_date=current_date,
         current_user=current_user,
-        prev_month_name=prev_month_name,
-        next_month_name=next_month_name,
-        month_calendar=calendar_date_list,
+        prev_month_name=month_grid.prev_month_name,
+        next_month_name=month_grid.next_month_name,
+        month_calendar=month_grid.month_dates,
         shifts=db_shifts,
         commitments=commitments
     )
 
-    if request.headers.get("HX-Request"):
+    if is_fragment:
         return templates.TemplateResponse(
             request=request,
             name="scheduling/fragments/schedule-list-oob.html",
-            context=context
+            context=context,
+            headers=headers
         )
 
     return templates.TemplateResponse(
         request=request,
         name="scheduling/index.html",
-        context=context
+        context=context,
+        headers=headers
     )
 
 
 async def create(
     request: Request,
     current_user: Annotated[CurrentUser, Depends(requires_user)],
+    conn: Annotated[sqlite3.Connection, Depends(get_db)],
 ):  
     if not current_user:
         if request.headers.get("hx-request"):
@@ -136,41 +125,129 @@ async def create(
 
     form_data = await request.form()
     shift_id = form_data.get("shift")
-    date = form_data.get("date")
-    date = f"{date} 00:00:00"
+    day = form_data.get("date")
 
-    if not shift_id or not date:
+    if not shift_id or not shift_id.isdigit() or not day:
         if request.headers.get("hx-request"):
             return Response(status_code=200, headers={"hx-refresh": "true"})
         else:
             return RedirectResponse(status_code=303, url="/scheduling")
     
-    commitment_id = Commitment.create(shift_id=shift_id, user_id=current_user.id, date=date, return_id=True)
-    db_commitment = Commitment.get(commitment_id=commitment_id)
-        
-    if request.headers.get("hx-request"):
-        with sqlite3.connect("db.sqlite3") as conn:
-                conn.execute("PRAGMA foreign_keys=ON;")
-                cursor = conn.cursor()
-                cursor.execute("SELECT id, long_name, short_name FROM shifts WHERE id = ?;", (shift_id, ))
-                shift_row = ShiftRow(*cursor.fetchone())
+    end_read_transaction(conn=conn)
+    # a repeated submit gets the existing commitment back
+    commitment = await write_queue.run(Commitment.add, shift_id=int(shift_id), user_id=current_user.id, day=day)
+
+    if not commitment:
+        if request.headers.get("hx-request"):
+            return Response(status_code=200, headers={"hx-refresh": "true"})
+        else:
+            return RedirectResponse(status_code=303, url="/scheduling")
 
+    if request.headers.get("hx-request"):
         return templates.TemplateResponse(
             request=request,
             name="scheduling/fragments/shift-exists-button.html",
             context=YesShiftBtn(
-                shift=shift_row,
-                commitment=db_commitment
+                shift=ShiftRow(id=commitment.shift_id, long_name=commitment.long_name, short_name=commitment.short_name),
+                commitment=commitment
             )
         )
     else:
         return RedirectResponse(status_code=303, url="/scheduling")
 
 
+def create_and_list_month(conn: sqlite3.Connection, shift_id: int, user_id: int, days: list[str], start_of_month: datetime.datetime, end_of_month: datetime.datetime):
+    """Adds the commitments and lists the month in the same transaction, for the write queue."""
+    Commitment.create_many(conn=conn, shift_id=shift_id, user_id=user_id, days=days)
+
+    return Commitment.list_month_for_user(conn=conn, start_of_month=start_of_month, end_of_month=end_of_month, user_id=user_id)
+
+
+async def create_many(
+    request: Request,
+    current_user: Annotated[CurrentUser, Depends(requires_user)],
+    conn: Annotated[sqlite3.Connection, Depends(get_db)],
+):
+    """Schedules one shift on many days, listed as date fields or as a start to end range filtered by weekday fields."""
+    if not current_user:
+        if request.headers.get("hx-request"):
+            response = Response(status_code=200, headers={"hx-redirect": f"/signin"})
+        else:
+            response = RedirectResponse(status_code=303, url=f"/signin")
+        response.delete_cookie("session-id")
+        return response
+
+    form_data = await request.form()
+    shift_id = form_data.get("shift")
+    try:
+        if form_data.getlist("date"):
+            days = sorted({datetime.date.fromisoformat(day) for day in form_data.getlist("date")})
+        else:
+            weekdays = {int(weekday) for weekday in form_data.getlist("weekday")} or None
+            start = datetime.date.fromisoformat(form_data.get("start", ""))
+            end = datetime.date.fromisoformat(form_data.get("end", ""))
+            # refused before the list is built, a wide range would hold up the event loop
+            if not 0 <= (end - start).days < MAX_BULK_DAYS:
+                raise ValueError("date range too long")
+            days = calendar_service.get_days_in_range(start=start, end=end, weekdays=weekdays)
+
+        # the grid being looked at, or the month of the first day
+        first_of_month = datetime.date(
+            year=int(form_data.get("year") or days[0].year),
+            month=int(form_data.get("month") or days[0].month),
+            day=1,
+        )
+    except (ValueError, IndexError):
+        days = []
+
+    db_shifts = Shift.list_user_shifts(conn=conn, user_id=current_user.id)
+    is_own_shift = bool(shift_id) and shift_id.isdigit() and int(shift_id) in {shift.id for shift in db_shifts}
+
+    if not is_own_shift or not days or len(days) > MAX_BULK_DAYS:
+        if request.headers.get("hx-request"):
+            return Response(status_code=200, headers={"hx-refresh": "true"})
+        else:
+            return RedirectResponse(status_code=303, url="/scheduling")
+
+    year = first_of_month.year
+    month = first_of_month.month
+    start_of_month = calendar_service.get_start_of_month(year=year, month=month)
+    end_of_month = calendar_service.get_end_of_month(year=year, month=month)
+
+    end_read_transaction(conn=conn)
+    # one executemany in one transaction instead of a request per day
+    db_commitments = await write_queue.run(
+        create_and_list_month,
+        shift_id=int(shift_id),
+        user_id=current_user.id,
+        days=[day.isoformat() for day in days],
+        start_of_month=start_of_month,
+        end_of_month=end_of_month,
+    )
+
+    if not request.headers.get("hx-request"):
+        return RedirectResponse(status_code=303, url=f"/scheduling/{year}/{month}")
+
+    commitments = {}
+    for commitment in db_commitments:
+        commitments.setdefault(commitment.day, {})[commitment.shift_id] = commitment
+
+    return templates.TemplateResponse(
+        request=request,
+        name="scheduling/fragments/schedule-days-oob.html",
+        context={
+            "month_calendar": calendar_service.get_month_grid(year=year, month=month).month_dates,
+            "shifts": db_shifts,
+            "commitments": commitments,
+        },
+    )
+
+
 async def delete(
     request: Request,
     schedule_id: int,
-    current_user=Depends(requires_schedule_owner)
+    current_user=Depends(requires_user),
+    conn: sqlite3.Connection = Depends(get_db),
 ):  
     if not current_user:
         if request.headers.get("hx-request"):
@@ -180,31 +257,24 @@ async def delete(
         response.delete_cookie("session-id")
         return response
     
-    db_commitment = Commitment.get(commitment_id=schedule_id)
+    end_read_transaction(conn=conn)
+    # one statement checks the owner, deletes and reads back the shift names,
+    # a repeated delete finds nothing and refreshes
+    commitment = await write_queue.run(Commitment.remove, commitment_id=schedule_id, user_id=current_user.id)
 
-    if not db_commitment:
+    if not commitment:
         if request.headers.get("hx-request"):
             return Response(status_code=200, headers={"hx-refresh": "true"})
         else:
             return RedirectResponse(status_code=303, url="/scheduling")
-        
-    db_commitment.delete()
-    
-    if request.headers.get("hx-request"):
-        with sqlite3.connect("db.sqlite3") as conn:
-            conn.execute("PRAGMA foreign_keys=ON;")
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, long_name, short_name FROM shifts WHERE id = ?;", (db_commitment.shift_id, ))
-            shift_row = ShiftRow(*cursor.fetchone())
-
-        date_obj = datetime.datetime.strptime(db_commitment.date, "%Y-%m-%d %H:%M:%S").date()
 
+    if request.headers.get("hx-request"):
         response = templates.TemplateResponse(
             request=request,
             name="scheduling/fragments/no-shift-button.html",
             context=NoShiftBtn(
-                date=date_obj,
-                shift=shift_row
+                date=datetime.date.fromisoformat(commitment.day),
+                shift=ShiftRow(id=commitment.shift_id, long_name=commitment.long_name, short_name=commitment.short_name)
             )
         )
 
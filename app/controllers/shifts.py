@@ -1,12 +1,14 @@
 import re
+import sqlite3
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, Form, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import RedirectResponse
 
 
 from app.core.template_utils import templates
-from app.dependencies import requires_shift_owner, requires_user
+from app.dependencies import get_db, requires_shift_owner, requires_user
 from app.models.shift import Shift
 from app.viewmodels.user import CurrentUser
 
@@ -15,7 +17,8 @@ router = APIRouter(prefix="/shifts")
 
 def index(
     request: Request,
-    current_user: Annotated[CurrentUser, Depends(requires_user)]
+    current_user: Annotated[CurrentUser, Depends(requires_user)],
+    conn: Annotated[sqlite3.Connection, Depends(get_db)],
     ):
     if not current_user:
         if request.headers.get("hx-request"):
@@ -23,7 +26,7 @@ def index(
         else:
             return RedirectResponse(status_code=303, url=f"/signin")
         
-    shifts_rows = Shift.list_user_shifts(user_id=current_user.id)
+    shifts_rows = Shift.list_user_shifts(conn=conn, user_id=current_user.id)
 
     context = {
         "current_user": current_user,
@@ -51,7 +54,8 @@ def index(
 
 def new(
     request: Request,
-    current_user: Annotated[CurrentUser, Depends(requires_user)]
+    current_user: Annotated[CurrentUser, Depends(requires_user)],
+    conn: Annotated[sqlite3.Connection, Depends(get_db)],
     ):
     if not current_user:
         if request.headers.get("hx-request"):
@@ -78,7 +82,8 @@ def new(
 def create(
     request: Request,
     shift_name: Annotated[str, Form()],
-    current_user: Annotated[CurrentUser, Depends(requires_user)]
+    current_user: Annotated[CurrentUser, Depends(requires_user)],
+    conn: Annotated[sqlite3.Connection, Depends(get_db)],
     ):
     if not current_user:
         if request.headers.get("hx-request"):
@@ -97,7 +102,7 @@ def create(
     for part in long_name_split:
         short_name += part[0].upper()
 
-    Shift.create(long_name=cleaned_shift_name, short_name=short_name, user_id=current_user.id)
+    Shift.create(conn=conn, long_name=cleaned_shift_name, short_name=short_name, user_id=current_user.id)
 
     if request.headers.get("hx-request"):
         return Response(status_code=200, headers={"hx-redirect": f"/shifts"})
@@ -108,7 +113,8 @@ def create(
 def edit(
     request: Request,
     shift_type_id: int,
-    current_user: Annotated[CurrentUser, Depends(requires_shift_owner)]
+    current_user: Annotated[CurrentUser, Depends(requires_shift_owner)],
+    conn: Annotated[sqlite3.Connection, Depends(get_db)],
 ):
     if not current_user:
         if request.headers.get("hx-request"):
@@ -118,7 +124,7 @@ def edit(
         
         return response
 
-    db_shift = Shift.get(shift_id=shift_type_id)
+    db_shift = Shift.get(conn=conn, shift_id=shift_type_id)
 
     if not db_shift:
         if request.headers.get("hx-request"):
@@ -140,7 +146,8 @@ def edit(
 async def update(
     request: Request,
     shift_type_id: int,
-    current_user: Annotated[CurrentUser, Depends(requires_shift_owner)]
+    current_user: Annotated[CurrentUser, Depends(requires_shift_owner)],
+    conn: Annotated[sqlite3.Connection, Depends(get_db)],
 ):  
     """Updates the user's shift. Receives long_name and short_name form fields"""
     if not current_user:
@@ -159,7 +166,7 @@ async def update(
         else:
             return RedirectResponse(status_code=303, url=f"/shifts/{shift_type_id}/edit")
         
-    db_shift = Shift.get(shift_id=shift_type_id)
+    db_shift = Shift.get(conn=conn, shift_id=shift_type_id)
 
     if not db_shift:
         if request.headers.get("hx-request"):
@@ -167,7 +174,8 @@ async def update(
         else:
             return RedirectResponse(status_code=303, url=f"/shifts")
         
-    db_shift.update(long_name=long_name, short_name=short_name)
+    # busy retries back off and wait for the write lock, off the event loop
+    await run_in_threadpool(db_shift.update, conn=conn, long_name=long_name, short_name=short_name)
         
     if request.headers.get("hx-request"):
         return Response(status_code=200, headers={"Hx-Refresh": "true"})
@@ -178,7 +186,8 @@ async def update(
 def delete(
     request: Request,
     shift_type_id: int,
-    current_user: Annotated[CurrentUser, Depends(requires_shift_owner)]
+    current_user: Annotated[CurrentUser, Depends(requires_shift_owner)],
+    conn: Annotated[sqlite3.Connection, Depends(get_db)],
 ):
     """Delete shift type"""
     if not current_user:
@@ -187,7 +196,7 @@ def delete(
         else:
             return RedirectResponse(status_code=303, url=f"/signin")
         
-    db_shift = Shift.get(shift_id=shift_type_id)
+    db_shift = Shift.get(conn=conn, shift_id=shift_type_id)
 
     if not db_shift:
         if request.headers.get("hx-request"):
@@ -195,6 +204,6 @@ def delete(
         else:
             return RedirectResponse(status_code=303, url=f"/shifts")
         
-    db_shift.delete()
+    db_shift.delete(conn=conn)
 
     return Response(status_code=200)
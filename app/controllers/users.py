@@ -1,20 +1,22 @@
+import sqlite3
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, Form, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
 
-from app.dependencies import requires_profile_owner, requires_user
+from app.core.template_utils import templates
+from app.dependencies import get_db, requires_profile_owner, requires_user
 from app.models.user import User
 from app.viewmodels.pages import ProfilePage
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 
 def profile(
     request: Request,
     current_user=Depends(requires_user),
+    conn: sqlite3.Connection = Depends(get_db),
 ):
     """Profile page"""
     if not current_user:
@@ -42,6 +44,7 @@ async def update(
     request: Request,
     user_id: int,
     current_user=Depends(requires_profile_owner),
+    conn: sqlite3.Connection = Depends(get_db),
 ):  
     """Updates a user resource"""
     if not current_user:
@@ -59,8 +62,9 @@ async def update(
         return Response(status_code=200, headers={"hx-refresh": "true"})
 
 
-    db_user = User.get(user_id=user_id)
-    db_user.update(form_data=form_data)
+    db_user = User.get(conn=conn, user_id=user_id)
+    # busy retries back off and wait for the write lock, off the event loop
+    await run_in_threadpool(db_user.update, conn=conn, form_data=form_data)
     
     return Response(status_code=200, headers={"hx-refresh": "true"})
 
@@ -68,7 +72,8 @@ async def update(
 def unique(
     request: Request,
     app_username: Annotated[str, Form()] = "",
-    current_user=Depends(requires_user),  
+    current_user=Depends(requires_user),
+    conn: sqlite3.Connection = Depends(get_db),
 ):
     if not current_user:
         if request.headers.get("hx-request"):
@@ -95,7 +100,7 @@ def unique(
     if app_username == current_user.username:
         return Response(status_code=200, headers={"hx-refresh": "true"})
 
-    username_taken = User.username_exists(username=app_username)
+    username_taken = User.username_exists(conn=conn, username=app_username)
 
     context = {
         "request": request,
@@ -0,0 +1,159 @@
+"""Retries with jittered backoff for writes that find the database locked"""
+
+import random
+import re
+import sqlite3
+import threading
+import time
+
+from app.core.config import get_settings
+
+BUSY_CODES = (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+WRITE_TARGET = re.compile(r"^\s*(INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+(\w+)", re.IGNORECASE)
+
+
+def is_busy(error: Exception) -> bool:
+    """True for SQLITE_BUSY, SQLITE_LOCKED and their extended codes."""
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is None:
+        return isinstance(error, sqlite3.OperationalError) and "locked" in str(error)
+
+    return code & 0xff in BUSY_CODES
+
+
+def is_snapshot_conflict(error: Exception) -> bool:
+    return getattr(error, "sqlite_errorcode", None) == sqlite3.SQLITE_BUSY_SNAPSHOT
+
+
+def operation_name(sql: str) -> str:
+    """Returns "INSERT schedules" style names for the stats."""
+    match = WRITE_TARGET.match(sql)
+    if not match:
+        return sql.split(None, 1)[0].upper() if sql.strip() else "?"
+
+    return f"{match.group(1).split()[0].upper()} {match.group(2)}"
+
+
+class RetryStats:
+    """Counters for one operation."""
+    __slots__ = ("calls", "retried", "retries", "failed")
+
+    def __init__(self):
+        self.calls = 0
+        self.retried = 0
+        self.retries = 0
+        self.failed = 0
+
+
+class BusyRetry:
+    """Calls a function up to `attempts` times while it raises a busy error."""
+
+    def __init__(self, attempts: int, base_delay: float, max_delay: float):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._stats: dict[str, RetryStats] = {}
+        self._lock = threading.Lock()
+
+    def call(self, operation: str, function, *args, retryable=is_busy, **kwargs):
+        retries = 0
+        while True:
+            try:
+                result = function(*args, **kwargs)
+            except sqlite3.Error as error:
+                if retries + 1 < self.attempts and retryable(error):
+                    retries += 1
+                    # full jitter up to base_delay * 2 ** retries, so workers
+                    # that collided do not retry in lockstep
+                    time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retries)))
+                    continue
+                self._record(operation=operation, retries=retries, failed=is_busy(error))
+                raise
+
+            self._record(operation=operation, retries=retries, failed=False)
+
+            return result
+
+    def _record(self, operation: str, retries: int, failed: bool):
+        with self._lock:
+            stats = self._stats.get(operation)
+            if stats is None:
+                stats = self._stats[operation] = RetryStats()
+            stats.calls += 1
+            if retries:
+                stats.retried += 1
+                stats.retries += retries
+            if failed:
+                stats.failed += 1
+
+    def stats(self) -> dict:
+        """Returns calls, calls retried, total retries and give-ups per operation."""
+        with self._lock:
+            return {
+                operation: {"calls": stats.calls, "retried": stats.retried, "retries": stats.retries, "failed": stats.failed}
+                for operation, stats in sorted(self._stats.items())
+            }
+
+    def clear(self):
+        with self._lock:
+            self._stats = {}
+
+
+settings = get_settings()
+
+busy_retry = BusyRetry(
+    attempts=int(settings.SQLITE_RETRY_ATTEMPTS),
+    base_delay=float(settings.SQLITE_RETRY_BASE_MS) / 1000,
+    max_delay=float(settings.SQLITE_RETRY_MAX_MS) / 1000,
+)
+
+
+def begin(conn: sqlite3.Connection, immediate: bool = False):
+    """Opens a transaction that a write finding the database locked can restart."""
+    conn.execute("BEGIN IMMEDIATE;" if immediate else "BEGIN;")
+    if hasattr(conn, "changes_at_begin"):
+        conn.changes_at_begin = conn.total_changes
+
+
+def _has_not_written(conn: sqlite3.Connection, error: Exception) -> bool:
+    # SQLITE_BUSY_SNAPSHOT only happens before the first write, plain busy
+    # errors need the transaction to have been opened with begin
+    if is_snapshot_conflict(error):
+        return True
+
+    return getattr(conn, "changes_at_begin", None) == conn.total_changes
+
+
+def _write(conn: sqlite3.Connection, sql: str, run) -> sqlite3.Cursor:
+    opens_transaction = not conn.in_transaction
+
+    def attempt():
+        try:
+            return run(conn.cursor())
+        except sqlite3.Error as error:
+            if opens_transaction and conn.in_transaction and is_busy(error):
+                # sqlite3 opened a transaction for this statement, start over clean
+                conn.rollback()
+            elif conn.in_transaction and is_busy(error) and _has_not_written(conn, error):
+                # a transaction that has only read cannot wait for the write
+                # lock, sqlite answers busy at once and retrying the statement
+                # does not help. Nothing is lost by restarting with the lock
+                # held up front: requests read their session and ownership
+                # first, which a concurrent commit does not change, and
+                # unique constraints guard the rest
+                conn.rollback()
+                busy_retry.call("BEGIN IMMEDIATE restart", begin, conn, immediate=True)
+                return run(conn.cursor())
+            raise
+
+    return busy_retry.call(operation_name(sql), attempt)
+
+
+def execute_write(conn: sqlite3.Connection, sql: str, params=()) -> sqlite3.Cursor:
+    """Runs one INSERT, UPDATE or DELETE with busy retries and returns its cursor."""
+    return _write(conn=conn, sql=sql, run=lambda cursor: cursor.execute(sql, params))
+
+
+def execute_many_write(conn: sqlite3.Connection, sql: str, rows: list) -> sqlite3.Cursor:
+    """Runs a statement once per parameter tuple in rows with busy retries and returns its cursor."""
+    return _write(conn=conn, sql=sql, run=lambda cursor: cursor.executemany(sql, rows))
@@ -0,0 +1,111 @@
+"""In-process caches shared by the application"""
+
+from collections import OrderedDict
+import sqlite3
+import threading
+import time
+
+SESSION_CACHE_SIZE = 2048
+SESSION_CACHE_TTL = 60
+
+CALENDAR_CACHE_SIZE = 4096
+CALENDAR_CACHE_MAX_BYTES = 32 * 1024 * 1024
+CALENDAR_CACHE_TTL = 600
+
+
+class TTLCache:
+    """Per-process bounded LRU cache whose entries expire after `ttl` seconds."""
+
+    # With max_bytes set, values must support len() and LRU entries are evicted until their total fits
+    def __init__(self, max_size: int, ttl: float, max_bytes: int = None):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _size_of(self, value) -> int:
+        return len(value) if self.max_bytes is not None else 0
+
+    def _pop(self, key):
+        entry = self._entries.pop(key)
+        self.bytes -= self._size_of(entry[1])
+
+    def get(self, key):
+        """Returns the cached value or None if missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    self._pop(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl: float = None):
+        """Stores a value, evicting the least recently used entries when full."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (expires_at, value)
+            self.bytes += self._size_of(value)
+            while len(self._entries) > self.max_size or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                self._pop(next(iter(self._entries)))
+
+    def delete(self, key):
+        """Removes one entry."""
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+
+    def delete_matching(self, predicate):
+        """Removes every entry where predicate(key, value) is true."""
+        with self._lock:
+            keys = [key for key, (_, value) in self._entries.items() if predicate(key, value)]
+            for key in keys:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        """Returns size, hit and miss counters and the hit rate."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# session token -> user id, read by app.dependencies.authenticate
+session_cache = TTLCache(max_size=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL)
+
+# (viewer id, etag) -> rendered calendar month html, read and filled by
+# app.handlers.calendar.get_calendar. The etag covers the data versions
+# of the viewer and partner, the header fields and the holiday version,
+# so entries are never served after a write.
+calendar_cache = TTLCache(max_size=CALENDAR_CACHE_SIZE, ttl=CALENDAR_CACHE_TTL, max_bytes=CALENDAR_CACHE_MAX_BYTES)
+
+
+def invalidate_calendar_months(conn: sqlite3.Connection, user_id: int):
+    """Drops this process's cached calendar months that show the user's shifts or schedule."""
+    # The key already changes with the data versions, this only frees entries that can no longer be hit
+    cursor = conn.cursor()
+    cursor.execute("SELECT sender_id FROM shares WHERE receiver_id = ?;", (user_id, ))
+    viewer_ids = {user_id, *(row[0] for row in cursor.fetchall())}
+    calendar_cache.delete_matching(lambda key, html: key[0] in viewer_ids)
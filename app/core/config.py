@@ -1,5 +1,6 @@
 """Configuration for the application."""
 
+from functools import lru_cache
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -20,6 +21,34 @@ class Settings(BaseSettings):
     CLOSED_DOWN: str = os.environ.get('CLOSED_DOWN')
 
     MAINTENANCE_MODE: str = os.environ.get('MAINTENANCE_MODE')
+
+    # connection PRAGMAs, see app/core/sqlite_profile.py
+    SQLITE_JOURNAL_MODE: str = os.environ.get('SQLITE_JOURNAL_MODE', 'wal')
+    SQLITE_SYNCHRONOUS: str = os.environ.get('SQLITE_SYNCHRONOUS', 'normal')
+    SQLITE_BUSY_TIMEOUT_MS: int = os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)
+    SQLITE_MMAP_SIZE: int = os.environ.get('SQLITE_MMAP_SIZE', 268435456)
+    SQLITE_CACHE_SIZE_KIB: int = os.environ.get('SQLITE_CACHE_SIZE_KIB', 16384)
+    SQLITE_TEMP_STORE: str = os.environ.get('SQLITE_TEMP_STORE', 'memory')
+
+    # retries of writes that find the database locked, see app/core/busy_retry.py
+    SQLITE_RETRY_ATTEMPTS: int = os.environ.get('SQLITE_RETRY_ATTEMPTS', 5)
+    SQLITE_RETRY_BASE_MS: float = os.environ.get('SQLITE_RETRY_BASE_MS', 10)
+    SQLITE_RETRY_MAX_MS: float = os.environ.get('SQLITE_RETRY_MAX_MS', 500)
+
+    # group commit of queued writes, see app/core/write_queue.py
+    WRITE_QUEUE_DELAY_MS: float = os.environ.get('WRITE_QUEUE_DELAY_MS', 0)
+    WRITE_QUEUE_MAX_BATCH: int = os.environ.get('WRITE_QUEUE_MAX_BATCH', 64)
+
+    # expired session cleanup, see app/services/session_sweeper.py
+    SESSION_SWEEP_BATCH_SIZE: int = os.environ.get('SESSION_SWEEP_BATCH_SIZE', 500)
+    SESSION_SWEEP_INTERVAL: float = os.environ.get('SESSION_SWEEP_INTERVAL', 300)
+
+    # statements at or over this many ms are logged, see app/core/slow_queries.py
+    SLOW_QUERY_MS: float = os.environ.get('SLOW_QUERY_MS', 50)
+    SLOW_QUERY_LOG: str = os.environ.get('SLOW_QUERY_LOG', 'logs/slow-queries.jsonl')
+
+    # admin request profiles, see app/core/profiling.py
+    PROFILE_DIR: str = os.environ.get('PROFILE_DIR', 'logs/profiles')
     
     BIRTHDAY_LINES: list[str] = os.environ.get("BIRTHDAY_LINES")
     BIRTHDAY_IDS: list[int] = os.environ.get("BIRTHDAY_IDS")
@@ -52,6 +81,8 @@ class Settings(BaseSettings):
 
 
 # or from config import get_settings -> var = get_settings()
+@lru_cache
 def get_settings() -> Settings:
     """Get the settings to use within application."""
+    # MAINTENANCE_MODE and CLOSED_DOWN here are only defaults, app/core/flags.py switches them at runtime
     return Settings()
@@ -0,0 +1,70 @@
+"""SQLite connection pool shared by models, handlers and dependencies"""
+
+from contextlib import contextmanager
+import sqlite3
+import threading
+
+from app.core.config import get_settings
+from app.core.instrumentation import TracedConnection
+from app.core.sqlite_profile import ConnectionProfile
+
+DB_PATH = "db.sqlite3"
+DEFAULT_POOL_SIZE = 8
+
+
+class ConnectionPool:
+    """Keeps up to `max_size` configured sqlite3 connections open between uses."""
+
+    def __init__(self, database: str, profile: ConnectionProfile, max_size: int = DEFAULT_POOL_SIZE):
+        self.database = database
+        self.profile = profile
+        self.max_size = max_size
+        self._idle: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # FastAPI runs sync dependencies and handlers on different threadpool workers
+        return self.profile.connect(self.database, check_same_thread=False, factory=TracedConnection)
+
+    def acquire(self) -> sqlite3.Connection:
+        """Returns an idle connection or opens a new one."""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+
+        return self._connect()
+
+    def release(self, conn: sqlite3.Connection):
+        """Resets the connection and returns it to the pool."""
+        if conn.in_transaction:
+            conn.rollback()
+        conn.row_factory = None
+
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append(conn)
+                return
+
+        # extra connection opened under load
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Yields a pooled connection, committed on success and rolled back on error."""
+        conn = self.acquire()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Closes every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+
+        for conn in idle:
+            conn.close()
+
+
+pool = ConnectionPool(DB_PATH, profile=ConnectionProfile.from_settings(get_settings()))
@@ -0,0 +1,81 @@
+"""Runtime on/off flags shared by every worker"""
+
+import sqlite3
+import threading
+import time
+
+from app.core.busy_retry import execute_write
+from app.core.config import get_settings
+from app.core.connection_pool import ConnectionPool, pool
+
+FLAG_NAMES = ("MAINTENANCE_MODE", "CLOSED_DOWN")
+FLAG_REFRESH_INTERVAL = 2.0
+
+
+class RuntimeFlags:
+    """Flags stored in the runtime_flags table, re-read at most every `refresh_interval` seconds."""
+
+    # A flag without a row falls back to Settings. is_on may run the query, so async code
+    # checks is_stale, awaits refresh in the threadpool and reads with cached instead.
+
+    def __init__(self, pool: ConnectionPool, defaults: dict, refresh_interval: float = FLAG_REFRESH_INTERVAL):
+        self.pool = pool
+        self.defaults = defaults
+        self.refresh_interval = refresh_interval
+        self._values = dict(defaults)
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.refresh_interval
+
+    def cached(self, name: str) -> bool:
+        """Returns the value from the last refresh without touching the database."""
+        return self._values.get(name, False)
+
+    def is_on(self, name: str) -> bool:
+        if self.is_stale():
+            self.refresh()
+
+        return self.cached(name)
+
+    def refresh(self):
+        """Re-reads the flags table. Only one thread reads, the rest keep the current values."""
+        if not self._lock.acquire(blocking=False):
+            return
+
+        try:
+            self._checked_at = time.monotonic()
+            try:
+                with self.pool.connection() as conn:
+                    rows = conn.execute("SELECT name, value FROM runtime_flags;").fetchall()
+            except sqlite3.OperationalError:
+                # table not migrated yet, keep the settings values
+                rows = []
+
+            values = dict(self.defaults)
+            values.update((name, bool(value)) for name, value in rows)
+            self._values = values
+        finally:
+            self._lock.release()
+
+    def set(self, conn: sqlite3.Connection, name: str, on: bool):
+        """Stores a flag for every worker, this one re-reads it on its next check."""
+        execute_write(conn=conn, sql="""INSERT INTO runtime_flags (name, value, updated_at) VALUES (?, ?, ?)
+                     ON CONFLICT (name) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at;
+                     """, params=(name, int(on), int(time.time())))
+        # the request's transaction may still roll back, so the value is
+        # only taken from the table once it is committed
+        self._checked_at = 0.0
+
+    def snapshot(self) -> dict:
+        """Returns the current value of every flag."""
+        return {name: self.is_on(name) for name in FLAG_NAMES}
+
+
+settings = get_settings()
+
+runtime_flags = RuntimeFlags(
+    pool=pool,
+    defaults={name: getattr(settings, name) == "true" for name in FLAG_NAMES},
+)
@@ -0,0 +1,287 @@
+"""Per-request timing of SQL, dependencies and template rendering, sent as Server-Timing."""
+
+import bisect
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+import math
+import sqlite3
+import time
+
+from jinja2 import Template
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.slow_queries import slow_query_log
+
+# upper bounds in milliseconds, the last bucket catches everything slower
+HISTOGRAM_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float("inf"))
+# requests per route kept for percentiles and throughput
+RECENT_REQUESTS = 1024
+
+
+class RequestTimings:
+    """Counters for one request, times in seconds."""
+    __slots__ = ("started_at", "sql_count", "sql_time", "dependency_time", "render_time")
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.dependency_time = 0.0
+        self.render_time = 0.0
+
+    def server_timing(self, total: float) -> str:
+        return ", ".join((
+            f'db;dur={self.sql_time * 1000:.2f};desc="{self.sql_count} queries"',
+            f"dep;dur={self.dependency_time * 1000:.2f}",
+            f"render;dur={self.render_time * 1000:.2f}",
+            f"total;dur={total * 1000:.2f}",
+        ))
+
+
+# set by TimingMiddleware, threadpool workers get a copy pointing at the same RequestTimings
+current_timings: ContextVar[RequestTimings] = ContextVar("current_timings", default=None)
+
+
+@contextmanager
+def _track(attribute: str):
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(timings, attribute, getattr(timings, attribute) + time.perf_counter() - start)
+
+
+def track_dependency():
+    """Adds the time spent in the block to the request's dependency time."""
+    return _track("dependency_time")
+
+
+def track_render():
+    """Adds the block's time to the request's render time, for renders that bypass Template.render."""
+    return _track("render_time")
+
+
+def _count_statement(statement: str):
+    # trace callback, called by sqlite for every statement it runs
+    timings = current_timings.get()
+    if timings is not None:
+        timings.sql_count += 1
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor that adds its execute and fetch time to the request's SQL time and logs slow statements."""
+    statement = None
+    parameters = ()
+    elapsed = 0.0
+    logged = False
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(self, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            timings = current_timings.get()
+            if timings is not None:
+                timings.sql_time += elapsed
+            self.elapsed += elapsed
+            if not self.logged and self.statement and self.elapsed * 1000 >= slow_query_log.threshold_ms:
+                self.logged = True
+                slow_query_log.record(conn=self.connection, sql=self.statement, params=self.parameters, elapsed_ms=self.elapsed * 1000)
+
+    def _start(self, sql: str, parameters):
+        self.statement = sql
+        self.parameters = parameters
+        self.elapsed = 0.0
+        self.logged = False
+
+    def execute(self, sql, parameters=()):
+        self._start(sql, parameters)
+        return self._timed(sqlite3.Cursor.execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        # parameters can be a generator, only the first set is kept for the log
+        seq_of_parameters = list(seq_of_parameters)
+        self._start(sql, seq_of_parameters[0] if seq_of_parameters else ())
+        return self._timed(sqlite3.Cursor.executemany, sql, seq_of_parameters)
+
+    def fetchone(self):
+        return self._timed(sqlite3.Cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._timed(sqlite3.Cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._timed(sqlite3.Cursor.fetchall)
+
+
+class TracedConnection(sqlite3.Connection):
+    """Connection whose cursors, including conn.execute(), are TracedCursors."""
+
+    # total_changes when app.core.busy_retry.begin opened the transaction
+    changes_at_begin = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_trace_callback(_count_statement)
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+
+class TimedTemplate(Template):
+    """Template that adds its render time to the request."""
+
+    def render(self, *args, **kwargs):
+        timings = current_timings.get()
+        if timings is None:
+            return super().render(*args, **kwargs)
+
+        start = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            timings.render_time += time.perf_counter() - start
+
+
+class RouteStats:
+    """Totals, a latency histogram and a ring of recent requests for one route."""
+    __slots__ = ("count", "errors", "total_ms", "sql_ms", "sql_count", "dependency_ms", "render_ms", "histogram", "recent")
+
+    def __init__(self, buckets: int, recent_size: int):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.sql_ms = 0.0
+        self.sql_count = 0
+        self.dependency_ms = 0.0
+        self.render_ms = 0.0
+        self.histogram = [0] * buckets
+        # (finished at, total ms), the oldest fall off the left
+        self.recent = deque(maxlen=recent_size)
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+
+    rank = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+
+    return sorted_values[rank]
+
+
+class RouteMetrics:
+    """Per-route request metrics for this worker."""
+
+    # Only TimingMiddleware records, on the event loop thread, so there is no lock. Percentiles and
+    # throughput use the last `recent_size` requests, counts, errors and averages everything since start.
+
+    def __init__(self, buckets: tuple = HISTOGRAM_BUCKETS, recent_size: int = RECENT_REQUESTS):
+        self.buckets = buckets
+        self.recent_size = recent_size
+        self.started_at = time.monotonic()
+        self._routes: dict[str, RouteStats] = {}
+
+    def record(self, route: str, status: int, total: float, timings: RequestTimings):
+        total_ms = total * 1000
+        stats = self._routes.get(route)
+        if stats is None:
+            stats = self._routes[route] = RouteStats(buckets=len(self.buckets), recent_size=self.recent_size)
+
+        stats.count += 1
+        if status >= 500:
+            stats.errors += 1
+        stats.total_ms += total_ms
+        stats.sql_ms += timings.sql_time * 1000
+        stats.sql_count += timings.sql_count
+        stats.dependency_ms += timings.dependency_time * 1000
+        stats.render_ms += timings.render_time * 1000
+        stats.histogram[bisect.bisect_left(self.buckets, total_ms)] += 1
+        stats.recent.append((time.monotonic(), total_ms))
+
+    def summary(self, route: str) -> dict:
+        """Returns percentiles, throughput, errors and averages for one route."""
+        stats = self._routes.get(route)
+        if stats is None or not stats.count:
+            return {"count": 0}
+
+        recent = list(stats.recent)
+        latencies = sorted(total_ms for _, total_ms in recent)
+        window = time.monotonic() - recent[0][0] if len(recent) > 1 else 0
+
+        return {
+            "count": stats.count,
+            "errors": stats.errors,
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+            "requests_per_second": len(recent) / window if window else None,
+            "avg_ms": stats.total_ms / stats.count,
+            "avg_sql_ms": stats.sql_ms / stats.count,
+            "sql_per_request": stats.sql_count / stats.count,
+            "avg_dependency_ms": stats.dependency_ms / stats.count,
+            "avg_render_ms": stats.render_ms / stats.count,
+            "histogram": list(stats.histogram),
+        }
+
+    def routes(self) -> list[str]:
+        return list(self._routes)
+
+    def clear(self):
+        self._routes = {}
+        self.started_at = time.monotonic()
+
+
+route_metrics = RouteMetrics()
+
+
+class TimingMiddleware:
+    """Times every HTTP request and adds a Server-Timing header."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        # unhandled exceptions never send a response start, count them as 500
+        status = 500
+
+        async def send_with_timing(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timings.server_timing(total=time.perf_counter() - timings.started_at))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_timings.reset(token)
+            # the router stores the matched route in the scope
+            path = getattr(scope.get("route"), "path", None) or "(no route)"
+            route_metrics.record(
+                route=f"{scope['method']} {path}",
+                status=status,
+                total=time.perf_counter() - timings.started_at,
+                timings=timings,
+            )
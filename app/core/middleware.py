@@ -0,0 +1,134 @@
+"""ASGI middleware for the application"""
+
+import asyncio
+import time
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import RedirectResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import get_settings
+from app.core.connection_pool import pool
+from app.core.flags import runtime_flags
+from app.core.profiling import PROFILE_COOKIE, PROFILE_PARAM, ProfileSession, current_profile, profile_store
+from app.core.template_utils import templates
+from app.dependencies import requires_admin
+
+MAINTENANCE_PATH = "/maintenance"
+# admins can still sign in and switch the flags back off
+ALWAYS_OPEN_PATHS = ("/admin", "/signin")
+
+
+def is_always_open(path: str) -> bool:
+    """True for the open paths and anything below them, not for /administrator."""
+    return any(path == open_path or path.startswith(f"{open_path}/") for open_path in ALWAYS_OPEN_PATHS)
+
+
+class GateMiddleware:
+    """Closed down, maintenance mode and dev latency in one pure ASGI layer"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.settings = get_settings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        settings = self.settings
+        path = scope["path"]
+        if is_always_open(path):
+            await self.app(scope, receive, send)
+            return
+
+        if runtime_flags.is_stale():
+            # the flags query must not block the event loop
+            await run_in_threadpool(runtime_flags.refresh)
+
+        if runtime_flags.cached("MAINTENANCE_MODE"):
+            if path != MAINTENANCE_PATH:
+                response = self.maintenance_response(scope=scope)
+                await response(scope, receive, send)
+                return
+        elif path == MAINTENANCE_PATH:
+            response = RedirectResponse(url="/")
+            await response(scope, receive, send)
+            return
+
+        if runtime_flags.cached("CLOSED_DOWN"):
+            request = Request(scope)
+            response = templates.TemplateResponse(
+                request=request,
+                name="closed-down.html",
+                context={"request": request}
+            )
+            await response(scope, receive, send)
+            return
+
+        # for working on loading states, without blocking the event loop
+        if settings.ENVIRONMENT == "dev" and getattr(settings, "SLEEP_TIME", 0):
+            await asyncio.sleep(settings.SLEEP_TIME)
+
+        await self.app(scope, receive, send)
+
+    def maintenance_response(self, scope: Scope):
+        request = Request(scope)
+        if request.headers.get("HX-Request"):
+            response = templates.TemplateResponse(
+                request=request,
+                name="maintenance.html",
+                context={"request": request}
+            )
+            response.headers["HX-Redirect"] = MAINTENANCE_PATH
+            return response
+
+        return RedirectResponse(url=MAINTENANCE_PATH)
+
+
+class ProfilerMiddleware:
+    """Profiles requests that ask with ?profile=1 or the profile cookie, for admins only."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.asks_for_profile(scope=scope):
+            await self.app(scope, receive, send)
+            return
+
+        if not await run_in_threadpool(self.is_admin, scope):
+            await self.app(scope, receive, send)
+            return
+
+        session = ProfileSession()
+        token = current_profile.set(session)
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_profile.reset(token)
+            await run_in_threadpool(
+                profile_store.save,
+                session=session,
+                method=scope["method"],
+                path=scope["path"],
+                total_ms=(time.perf_counter() - started_at) * 1000,
+            )
+
+    def asks_for_profile(self, scope: Scope) -> bool:
+        marker = f"{PROFILE_PARAM}=".encode()
+        cookie_marker = f"{PROFILE_COOKIE}=".encode()
+        if marker not in scope["query_string"] and not any(
+            name == b"cookie" and cookie_marker in value for name, value in scope["headers"]
+        ):
+            return False
+
+        request = Request(scope)
+
+        return request.query_params.get(PROFILE_PARAM) == "1" or request.cookies.get(PROFILE_COOKIE) == "1"
+
+    def is_admin(self, scope: Scope) -> bool:
+        with pool.connection() as conn:
+            return requires_admin(request=Request(scope), conn=conn) is not None
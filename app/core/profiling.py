@@ -0,0 +1,152 @@
+"""Opt-in cProfile runs of single requests, for admins, merged into one pstats file."""
+
+import cProfile
+from contextlib import contextmanager
+from contextvars import ContextVar
+import functools
+import inspect
+import os
+import pstats
+import re
+import secrets
+import threading
+import time
+
+from app.core.config import get_settings
+
+PROFILE_PARAM = "profile"
+PROFILE_COOKIE = "profile"
+PROFILES_KEPT = 50
+
+PROFILE_NAME = re.compile(r"^[\w.-]+\.prof$")
+PATH_SLUG = re.compile(r"[^\w]+")
+
+
+class ProfileSession:
+    """The cProfile runs collected for one request."""
+    __slots__ = ("profiles",)
+
+    def __init__(self):
+        self.profiles: list[cProfile.Profile] = []
+
+    def stats(self) -> pstats.Stats:
+        """Returns every run merged, or None when nothing was profiled."""
+        if not self.profiles:
+            return None
+
+        stats = pstats.Stats(self.profiles[0])
+        for profile in self.profiles[1:]:
+            stats.add(profile)
+
+        return stats
+
+
+# Sync dependencies and handlers run on different threadpool workers, so each profiled block gets its own
+# cProfile.Profile on its thread. Async handlers profile on the loop and can pick up other requests while they await.
+current_profile: ContextVar[ProfileSession] = ContextVar("current_profile", default=None)
+
+# a thread runs one profiler at a time, nested blocks join the outer one
+_active = threading.local()
+
+
+@contextmanager
+def profile_block():
+    """Runs the block under cProfile when the request is being profiled."""
+    session = current_profile.get()
+    if session is None or getattr(_active, "profiling", False):
+        yield
+        return
+
+    profile = cProfile.Profile()
+    _active.profiling = True
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        _active.profiling = False
+        session.profiles.append(profile)
+
+
+def profiled(handler):
+    """Wraps a route handler in profile_block, keeping its signature for FastAPI."""
+    if inspect.iscoroutinefunction(handler):
+        @functools.wraps(handler)
+        async def async_wrapper(*args, **kwargs):
+            with profile_block():
+                return await handler(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        with profile_block():
+            return handler(*args, **kwargs)
+
+    return wrapper
+
+
+class ProfileStore:
+    """Saved profiles in one directory, newest `keep` only."""
+
+    def __init__(self, directory: str, keep: int = PROFILES_KEPT):
+        self.directory = directory
+        self.keep = keep
+
+    def save(self, session: ProfileSession, method: str, path: str, total_ms: float) -> str:
+        """Writes the merged profile and returns its file name."""
+        stats = session.stats()
+        if stats is None:
+            return None
+
+        os.makedirs(self.directory, exist_ok=True)
+        now = time.time()
+        # sortable by time, the random part keeps same-millisecond saves apart
+        stamp = f"{time.strftime('%Y%m%dT%H%M%S', time.localtime(now))}{int(now * 1000) % 1000:03d}-{secrets.token_hex(2)}"
+        slug = PATH_SLUG.sub("-", path).strip("-") or "root"
+        name = f"{stamp}-{method}-{slug}-{total_ms:.0f}ms.prof"
+        stats.dump_stats(os.path.join(self.directory, name))
+        self.prune()
+
+        return name
+
+    def prune(self):
+        for name in self.names()[self.keep:]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+
+    def names(self) -> list[str]:
+        """Returns profile file names, newest first."""
+        try:
+            names = [name for name in os.listdir(self.directory) if PROFILE_NAME.match(name)]
+        except FileNotFoundError:
+            return []
+
+        return sorted(names, reverse=True)
+
+    def list(self) -> list[dict]:
+        profiles = []
+        for name in self.names():
+            try:
+                size = os.path.getsize(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            profiles.append({"name": name, "size": size})
+
+        return profiles
+
+    def path_for(self, name: str) -> str:
+        """Returns the path of a saved profile, or None for unknown or unsafe names."""
+        if not PROFILE_NAME.match(name):
+            return None
+
+        path = os.path.join(self.directory, name)
+
+        return path if os.path.isfile(path) else None
+
+
+settings = get_settings()
+
+profile_store = ProfileStore(directory=settings.PROFILE_DIR)
@@ -0,0 +1,157 @@
+"""Log of SQL statements at or over SLOW_QUERY_MS, written as JSON lines with their query plan."""
+
+import json
+import logging
+from logging.handlers import RotatingFileHandler
+import os
+import re
+import sqlite3
+import sys
+import time
+
+from app.core.config import get_settings
+
+SLOW_QUERY_LOG_MAX_BYTES = 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 3
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REDACTED = "[redacted]"
+# bcrypt, argon2 and pbkdf2 hashes as written by passlib
+PASSWORD_HASH = re.compile(r"^\$(2[abxy]?|argon2(id|i|d)?|pbkdf2[-_\w]*)\$")
+# statements binding a session token, every string parameter is redacted
+SECRET_COLUMN = re.compile(r"\btoken\b", re.IGNORECASE)
+SECRET_KEYS = ("password", "token")
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r"\b\d+(\.\d+)?\b")
+WHITESPACE = re.compile(r"\s+")
+EXPLAINABLE = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|REPLACE|WITH)\b", re.IGNORECASE)
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapses whitespace and replaces inline literals with ?."""
+    sql = STRING_LITERAL.sub("?", sql)
+    sql = NUMBER_LITERAL.sub("?", sql)
+
+    return WHITESPACE.sub(" ", sql).strip()
+
+
+def redact(value):
+    if isinstance(value, str) and PASSWORD_HASH.match(value):
+        return REDACTED
+    if isinstance(value, bytes):
+        return f"<{len(value)} bytes>"
+
+    return value
+
+
+def redact_params(params, sql: str = ""):
+    """Returns JSON-ready parameters with password hashes and session tokens replaced."""
+    binds_secret = bool(SECRET_COLUMN.search(sql))
+
+    def redact_value(value, key: str = ""):
+        if binds_secret and isinstance(value, str) or any(secret in key.lower() for secret in SECRET_KEYS):
+            return REDACTED
+
+        return redact(value)
+
+    if isinstance(params, dict):
+        return {key: redact_value(value, key=key) for key, value in params.items()}
+
+    return [redact_value(value) for value in params]
+
+
+def find_caller() -> str:
+    """Returns module:function:line of the innermost app frame outside app/core."""
+    # statements run by app/core itself, like the flags refresh, fall back to its innermost frame
+    core_dir = os.path.join(APP_DIR, "core")
+    tracing_files = (os.path.abspath(__file__), os.path.join(core_dir, "instrumentation.py"))
+    fallback = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(core_dir):
+            if fallback is None and filename not in tracing_files:
+                fallback = frame
+        elif filename.startswith(APP_DIR) or os.path.basename(filename) in ("main.py", "router.py"):
+            break
+        frame = frame.f_back
+
+    frame = frame or fallback
+    if frame is None:
+        return None
+
+    module = os.path.relpath(frame.f_code.co_filename, os.path.dirname(APP_DIR))
+
+    return f"{module}:{frame.f_code.co_name}:{frame.f_lineno}"
+
+
+def explain(conn: sqlite3.Connection, sql: str, params) -> list[str]:
+    """Returns the EXPLAIN QUERY PLAN rows for a statement, or nothing."""
+    if not EXPLAINABLE.match(sql):
+        return []
+
+    try:
+        cursor = sqlite3.Cursor(conn)
+        rows = cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    except sqlite3.Error:
+        return []
+
+    return [row[3] for row in rows]
+
+
+class SlowQueryLog:
+    """Writes slow statements to a size-rotated JSONL file."""
+
+    def __init__(self, path: str, threshold_ms: float):
+        self.path = path
+        self.threshold_ms = threshold_ms
+        self._logger = None
+
+    @property
+    def logger(self) -> logging.Logger:
+        if self._logger is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handler = RotatingFileHandler(self.path, maxBytes=SLOW_QUERY_LOG_MAX_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger = logging.getLogger("app.slow_queries")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            logger.addHandler(handler)
+            self._logger = logger
+
+        return self._logger
+
+    def record(self, conn: sqlite3.Connection, sql: str, params, elapsed_ms: float):
+        entry = {
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "ms": round(elapsed_ms, 3),
+            "sql": normalize_sql(sql),
+            "params": redact_params(params, sql=sql),
+            "caller": find_caller(),
+            "plan": explain(conn=conn, sql=sql, params=params),
+        }
+        self.logger.info(json.dumps(entry, default=str))
+
+    def tail(self, limit: int = 200) -> list[dict]:
+        """Returns up to `limit` entries from the current file, newest first."""
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                lines = file.readlines()[-limit:]
+        except FileNotFoundError:
+            return []
+
+        entries = []
+        for line in reversed(lines):
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+
+        return entries
+
+
+settings = get_settings()
+
+slow_query_log = SlowQueryLog(path=settings.SLOW_QUERY_LOG, threshold_ms=float(settings.SLOW_QUERY_MS))
@@ -0,0 +1,73 @@
+"""PRAGMAs every sqlite3 connection is opened with"""
+
+from dataclasses import dataclass
+import sqlite3
+
+from app.core.config import Settings
+
+JOURNAL_MODES = ("delete", "truncate", "persist", "memory", "wal", "off")
+SYNCHRONOUS_MODES = ("off", "normal", "full", "extra")
+TEMP_STORES = ("default", "file", "memory")
+
+
+@dataclass(frozen=True)
+class ConnectionProfile:
+    """Connection settings applied to every connection the app opens."""
+    # readers keep reading while a write commits, stored in the database file
+    journal_mode: str = "wal"
+    # safe with WAL, power loss can drop the last commits but never corrupts, and commits skip an fsync
+    synchronous: str = "normal"
+    # wait for the write lock instead of failing at once, stale read snapshots still need busy_retry
+    busy_timeout_ms: int = 5000
+    mmap_size: int = 256 * 1024 * 1024
+    cache_size_kib: int = 16 * 1024
+    temp_store: str = "memory"
+    foreign_keys: bool = True
+
+    def __post_init__(self):
+        # values end up in PRAGMA statements, which take no parameters
+        for name, value, allowed in (
+            ("journal_mode", self.journal_mode, JOURNAL_MODES),
+            ("synchronous", self.synchronous, SYNCHRONOUS_MODES),
+            ("temp_store", self.temp_store, TEMP_STORES),
+        ):
+            if value not in allowed:
+                raise ValueError(f"{name} must be one of {', '.join(allowed)}, got {value!r}")
+
+        for name in ("busy_timeout_ms", "mmap_size", "cache_size_kib"):
+            if not isinstance(getattr(self, name), int) or getattr(self, name) < 0:
+                raise ValueError(f"{name} must be a non-negative int")
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "ConnectionProfile":
+        return cls(
+            journal_mode=settings.SQLITE_JOURNAL_MODE.lower(),
+            synchronous=settings.SQLITE_SYNCHRONOUS.lower(),
+            busy_timeout_ms=int(settings.SQLITE_BUSY_TIMEOUT_MS),
+            mmap_size=int(settings.SQLITE_MMAP_SIZE),
+            cache_size_kib=int(settings.SQLITE_CACHE_SIZE_KIB),
+            temp_store=settings.SQLITE_TEMP_STORE.lower(),
+        )
+
+    def pragmas(self) -> list[str]:
+        return [
+            f"PRAGMA journal_mode={self.journal_mode};",
+            f"PRAGMA synchronous={self.synchronous};",
+            f"PRAGMA busy_timeout={self.busy_timeout_ms};",
+            f"PRAGMA mmap_size={self.mmap_size};",
+            # negative means KiB instead of pages
+            f"PRAGMA cache_size=-{self.cache_size_kib};",
+            f"PRAGMA temp_store={self.temp_store};",
+            f"PRAGMA foreign_keys={'ON' if self.foreign_keys else 'OFF'};",
+        ]
+
+    def apply(self, conn: sqlite3.Connection):
+        for pragma in self.pragmas():
+            conn.execute(pragma).fetchall()
+
+    def connect(self, database: str, **kwargs) -> sqlite3.Connection:
+        """Opens a connection and applies the profile to it."""
+        conn = sqlite3.connect(database, timeout=self.busy_timeout_ms / 1000, **kwargs)
+        self.apply(conn)
+
+        return conn
@@ -6,10 +6,14 @@ from jinja2_fragments.fastapi import Jinja2Blocks
 
 from fastapi.templating import Jinja2Templates
 
+from app.core.instrumentation import TimedTemplate
+
 env = Environment(
     loader=FileSystemLoader("templates"),
     autoescape=select_autoescape(['html', 'xml'])
 )
+# render time shows up in the Server-Timing header
+env.template_class = TimedTemplate
 
 templates = Jinja2Templates(directory="templates")
 block_templates = Jinja2Blocks(directory="templates")
@@ -0,0 +1,170 @@
+"""Group commit of small writes through one writer thread per process"""
+
+import asyncio
+from concurrent.futures import Future
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+from app.core.busy_retry import busy_retry
+from app.core.config import get_settings
+from app.core.connection_pool import ConnectionPool, pool
+from app.core.instrumentation import TracedConnection
+
+_STOP = object()
+
+
+class WriteQueue:
+    """Runs write functions from many requests in shared BEGIN IMMEDIATE transactions, one commit per batch."""
+
+    def __init__(self, pool: ConnectionPool, max_delay: float, max_batch: int):
+        self.pool = pool
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, write, **kwargs) -> Future:
+        """Queues `write(conn=..., **kwargs)` and returns a future for its result."""
+        # the writer has its own connection, so the request's connection will
+        # not see the write if it has already read. Callers use the result
+        # instead of reading the row back, and writes that need uncommitted
+        # rows of the request stay on the request's connection
+        self._start()
+        future = Future()
+        self._queue.put((future, write, kwargs))
+
+        return future
+
+    def execute(self, write, **kwargs):
+        """Queues a write and blocks until it is committed, for sync handlers."""
+        return self.submit(write, **kwargs).result()
+
+    async def run(self, write, **kwargs):
+        """Queues a write and awaits its commit, for async handlers."""
+        return await asyncio.wrap_future(self.submit(write, **kwargs))
+
+    def close(self):
+        """Commits what is queued and stops the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _start(self):
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._write_loop, name="write-queue", daemon=True)
+                self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        # autocommit, the loop issues BEGIN and COMMIT itself
+        return self.pool.profile.connect(
+            self.pool.database,
+            check_same_thread=False,
+            factory=TracedConnection,
+            isolation_level=None,
+        )
+
+    def _next_batch(self) -> tuple[list, bool]:
+        """Blocks for one write, then collects more. Returns the batch and whether to stop."""
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+
+        # writes arriving while a commit runs form the next batch, so batches
+        # grow with load even without a delay
+        batch = [item]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                timeout = deadline - time.monotonic()
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+
+        return batch, False
+
+    def _write_loop(self):
+        conn = self._connect()
+        try:
+            stop = False
+            while not stop:
+                batch, stop = self._next_batch()
+                if batch:
+                    self._commit(conn=conn, batch=batch)
+        finally:
+            conn.close()
+
+    def _commit(self, conn: sqlite3.Connection, batch: list):
+        outcomes = []
+        started = []
+        handled = 0
+        try:
+            # nothing has run yet, so waiting out a busy lock is safe
+            busy_retry.call("BEGIN IMMEDIATE", conn.execute, "BEGIN IMMEDIATE;")
+            for future, write, kwargs in batch:
+                handled += 1
+                if not future.set_running_or_notify_cancel():
+                    continue
+                started.append(future)
+                outcomes.append((future, *self._run_write(conn=conn, write=write, kwargs=kwargs)))
+            conn.execute("COMMIT;")
+        except Exception as error:
+            logging.exception("Write queue batch of %s writes failed", len(batch))
+            if conn.in_transaction:
+                conn.execute("ROLLBACK;")
+            # nothing in the batch was committed
+            outcomes = [(future, None, error) for future in started]
+            outcomes += [
+                (future, None, error)
+                for future, _, _ in batch[handled:] if future.set_running_or_notify_cancel()
+            ]
+
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def _run_write(self, conn: sqlite3.Connection, write, kwargs: dict) -> tuple:
+        """Runs one write in a savepoint and returns (result, exception)."""
+        # one write that raises is rolled back alone, the rest still commit
+        conn.execute("SAVEPOINT queued_write;")
+        try:
+            result = write(conn=conn, **kwargs)
+        except Exception as error:
+            conn.execute("ROLLBACK TO queued_write;")
+            conn.execute("RELEASE queued_write;")
+            return None, error
+
+        conn.execute("RELEASE queued_write;")
+
+        return result, None
+
+
+def end_read_transaction(conn: sqlite3.Connection):
+    """Commits the request's transaction so it holds no lock while its write is queued."""
+    # with a rollback journal its read lock keeps the writer's COMMIT
+    # waiting until busy_timeout runs out
+    if conn.in_transaction:
+        conn.commit()
+
+
+settings = get_settings()
+
+write_queue = WriteQueue(
+    pool=pool,
+    max_delay=float(settings.WRITE_QUEUE_DELAY_MS) / 1000,
+    max_batch=int(settings.WRITE_QUEUE_MAX_BATCH),
+)
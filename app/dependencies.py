@@ -1,152 +1,133 @@
 """Application dependencies"""
-import sqlite3
 import logging
+import sqlite3
+import time
 
-from fastapi import Request
+from fastapi import Depends, Request
 
-from app.models.user import User
-from app.viewmodels.structs import UserRow
+from app.core.busy_retry import begin, execute_write
+from app.core.cache import session_cache
+from app.core.connection_pool import pool
+from app.core.instrumentation import track_dependency
+from app.core.profiling import profile_block
 from app.viewmodels.user import CurrentUser
 
 
-def requires_guest(request: Request) -> CurrentUser:
-    """Checks for a session and returns a guest user"""
-    session_id = request.cookies.get("session-id")
+def get_db():
+    """Yields one pooled connection for the whole request, committed when it finishes and rolled back if the handler raises."""
+    with pool.connection() as conn:
+        # every read sees the same snapshot, a first write that finds it out
+        # of date restarts the transaction (see app.core.busy_retry)
+        begin(conn)
+        yield conn
 
-    if not session_id:
-        logging.info("User dependency no session id found")
-        return None
-    
-    with sqlite3.connect("db.sqlite3") as conn:
-        conn.execute("PRAGMA foreign_keys=ON;")
-        cursor = conn.cursor()
-        cursor.execute("SELECT user_id FROM sessions WHERE token = ?", (session_id, ))
-        session = cursor.fetchone()
-        
-    user = User.get_current_user(user_id=session[0])
 
-    return user
+# resource name -> (table, owner column) used for ownership checks
+OWNED_RESOURCES = {
+    "shift": ("shifts", "user_id"),
+    "profile": ("users", "id"),
+}
 
-def requires_user(request: Request) -> CurrentUser:
-    """Checks for a session and returns an authenticated user"""
+
+@track_dependency()
+@profile_block()
+def authenticate(
+    request: Request,
+    conn: sqlite3.Connection,
+    resource: str = None,
+    resource_id: int = None,
+) -> CurrentUser:
+    """Resolves the session cookie, and the owner of `resource` if given, to the current user"""
     session_id = request.cookies.get("session-id")
 
     if not session_id:
         logging.info("User dependency no session id found")
         return None
-    
-    with sqlite3.connect("db.sqlite3") as conn:
-        conn.execute("PRAGMA foreign_keys=ON;")
-        cursor = conn.cursor()
-        cursor.execute("SELECT user_id FROM sessions WHERE token = ?", (session_id, ))
-        session = cursor.fetchone()
-        
-    user = User.get_current_user(user_id=session[0])
 
-    return user
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+
+    owner_column = "NULL"
+    owner_join = ""
+    owner_params = ()
+    if resource:
+        table, column = OWNED_RESOURCES[resource]
+        owner_column = f"resource.{column}"
+        owner_join = f"LEFT JOIN {table} AS resource ON resource.id = ?"
+        owner_params = (resource_id, )
+
+    cached_user_id = session_cache.get(session_id)
+    if cached_user_id:
+        # another worker may have deleted the session or edited the profile,
+        # so only the token's user id is cached and both are read again
+        row = cursor.execute(f"""
+            SELECT users.id, users.display_name, users.email, users.birthday, users.username, users.is_admin,
+                {owner_column} AS owner_id
+            FROM users
+            {owner_join}
+            WHERE users.id = ? AND EXISTS (SELECT 1 FROM sessions WHERE sessions.token = ?);
+            """, (*owner_params, cached_user_id, session_id)).fetchone()
+    else:
+        now = int(time.time())
+        row = cursor.execute(f"""
+            SELECT users.id, users.display_name, users.email, users.birthday, users.username, users.is_admin,
+                sessions.expires_at, {owner_column} AS owner_id
+            FROM sessions
+            JOIN users ON users.id = sessions.user_id
+            {owner_join}
+            WHERE sessions.token = ? AND sessions.expires_at > ?;
+            """, (*owner_params, session_id, now)).fetchone()
+
+    if not row:
+        logging.info("User dependency no active session found for session id")
+        session_cache.delete(session_id)
+        return None
 
+    user = CurrentUser.from_row(row=row)
+    owner_id = row["owner_id"]
+    if not cached_user_id:
+        # never keep a session cached past its expiry
+        session_cache.set(session_id, user.id, ttl=min(session_cache.ttl, row["expires_at"] - now))
 
-def requires_shift_owner(request: Request, shift_type_id: int):
-    """Checks for a session and checks the user owns the resource before returns an authenticated user"""
-    session_id = request.cookies.get("session-id")
+    if not resource:
+        return user
 
-    if not session_id:
-        logging.info("User dependency no session id found")
+    if owner_id is None:
         return None
-    
-    with sqlite3.connect("db.sqlite3") as conn:
-        conn.execute("PRAGMA foreign_keys=ON;")
-        cursor = conn.cursor()
-        cursor.execute("SELECT user_id FROM sessions WHERE token = ?", (session_id, ))
-        session = cursor.fetchone()
-        
-        cursor.execute("SELECT id, display_name, is_admin, birthday, username, email FROM users WHERE id = ?", (session[0],))
-        user = cursor.fetchone()
-
-        cursor.execute("SELECT user_id FROM shifts WHERE id = ?", (shift_type_id, ))
-        shift = cursor.fetchone()
-
-    if user[0] != shift[0]:
-        with sqlite3.connect("db.sqlite3") as conn:
-            conn.execute("PRAGMA foreign_keys=ON;")
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM sessions WHERE token = ?", (session_id, ))
+
+    if owner_id != user.id:
+        execute_write(conn=conn, sql="DELETE FROM sessions WHERE token = ?", params=(session_id, ))
+        session_cache.delete(session_id)
         return None
 
     return user
 
 
-def requires_schedule_owner(request: Request, schedule_id: int) -> UserRow:
-    """Checks for a session and checks the user owns the resource before returns an authenticated user"""
-    session_id = request.cookies.get("session-id")
+def requires_guest(request: Request, conn: sqlite3.Connection = Depends(get_db)) -> CurrentUser:
+    """Checks for a session and returns a guest user"""
+    return authenticate(request=request, conn=conn)
 
-    if not session_id:
-        logging.info("User dependency no session id found")
-        return None
-    
-    with sqlite3.connect("db.sqlite3") as conn:
-        conn.execute("PRAGMA foreign_keys=ON;")
-        cursor = conn.cursor()
-        cursor.execute("SELECT user_id FROM sessions WHERE token = ?", (session_id, ))
-        session = cursor.fetchone()
-        
-        cursor.execute("SELECT id, display_name, is_admin, birthday, username, email FROM users WHERE id = ?", (session[0],))
-        user = UserRow(*cursor.fetchone())
-
-        cursor.execute("SELECT user_id FROM schedules WHERE id = ?", (schedule_id, ))
-        schedule = cursor.fetchone()
-
-    if user[0] != schedule[0]:
-        with sqlite3.connect("db.sqlite3") as conn:
-            conn.execute("PRAGMA foreign_keys=ON;")
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM sessions WHERE token = ?", (session_id, ))
-        return None
 
-    return user
+def requires_user(request: Request, conn: sqlite3.Connection = Depends(get_db)) -> CurrentUser:
+    """Checks for a session and returns an authenticated user"""
+    return authenticate(request=request, conn=conn)
 
 
-def requires_profile_owner(request: Request, user_id: int) -> UserRow:
-    session_id = request.cookies.get("session-id")
-    if not session_id:
-        logging.info("User dependency no session id found")
-        return None
-    
-    with sqlite3.connect("db.sqlite3") as conn:
-        conn.execute("PRAGMA foreign_keys=ON;")
-        cursor = conn.cursor()
-        cursor.execute("SELECT user_id FROM sessions WHERE token = ?", (session_id, ))
-        session = cursor.fetchone()
-        
-        cursor.execute("SELECT id, display_name, is_admin, birthday, username, email FROM users WHERE id = ?", (session[0],))
-        user = UserRow(*cursor.fetchone())
-
-    if user[0] != user_id:
-        with sqlite3.connect("db.sqlite3") as conn:
-            conn.execute("PRAGMA foreign_keys=ON;")
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM sessions WHERE token = ?", (session_id, ))
-        return None
+def requires_shift_owner(request: Request, shift_type_id: int, conn: sqlite3.Connection = Depends(get_db)) -> CurrentUser:
+    """Checks for a session and checks the user owns the resource before returns an authenticated user"""
+    return authenticate(request=request, conn=conn, resource="shift", resource_id=shift_type_id)
 
-    return user
 
-def requires_admin(request: Request):
-    session_id = request.cookies.get("session-id")
-    if not session_id:
-        logging.info("User dependency no session id found")
-        return None
-    
-    with sqlite3.connect("db.sqlite3") as conn:
-        conn.execute("PRAGMA foreign_keys=ON;")
-        cursor = conn.cursor()
-        cursor.execute("SELECT user_id FROM sessions WHERE token = ?", (session_id, ))
-        session = cursor.fetchone()
-        
-        cursor.execute("SELECT id, display_name, is_admin, birthday, username, email FROM users WHERE id = ?", (session[0],))
-        user = UserRow(*cursor.fetchone())
-
-    if not user.is_admin:
+def requires_profile_owner(request: Request, user_id: int, conn: sqlite3.Connection = Depends(get_db)) -> CurrentUser:
+    """Checks for a session and checks the user owns the profile before returns an authenticated user"""
+    return authenticate(request=request, conn=conn, resource="profile", resource_id=user_id)
+
+
+def requires_admin(request: Request, conn: sqlite3.Connection = Depends(get_db)) -> CurrentUser:
+    """Checks for a session and returns the user if they are an admin"""
+    user = authenticate(request=request, conn=conn)
+
+    if not user or not user.is_admin:
         return None
 
     return user
-
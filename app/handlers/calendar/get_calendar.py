@@ -6,15 +6,16 @@ from typing import Optional
 from zoneinfo import ZoneInfo
 
 from fastapi import Request
-from fastapi.responses import Response, RedirectResponse
+from fastapi.responses import HTMLResponse, Response, RedirectResponse
+from app.core.cache import calendar_cache
 from app.core.config import get_settings
-from app.core.template_utils import templates
-from app.models.commitment import Commitment
+from app.core.instrumentation import track_render
+from app.core.template_utils import block_templates, templates
 from app.models.shift import Shift
 from app.models.user import User
-from app.services import calendar_service
+from app.services import calendar_service, etags
+from app.services.calendar_loader import build_day_cells, load_month_schedules
 from app.viewmodels.pages import CalendarMonthPage
-from app.viewmodels.structs import UserRow
 
 settings = get_settings()
 
@@ -23,75 +24,23 @@ def get_calendar(
     year: int,
     month: int,
     current_user: User,
+    conn: sqlite3.Connection,
     day: Optional[int] = None
     ):
     """Returns calendar month view."""
     if not current_user:
         if request.headers.get("hx-request"):
-            return Response(status_code=200, header={"hx-redirect": f"/"})
+            return Response(status_code=200, headers={"hx-redirect": f"/"})
         else:
             return RedirectResponse(status_code=303, url=f"/")
+    show_day = day is not None
+    # htmx month navigation only swaps the grid, history restores need the page
+    is_fragment = bool(request.headers.get("hx-request")) and not request.headers.get("hx-history-restore-request")
     if not day:
         day = 1
         
     current_month_object = datetime.date(year=year, month=month, day=day)
 
-    # for calendar controls
-    prev_month_object = datetime.date(year=year if month != 1 else year - 1, month=month - 1 if month != 1 else 12, day=1)
-    next_month_object = datetime.date(year=year if month != 12 else year + 1, month=month + 1 if month != 12 else 1, day=1)
-    
-    with sqlite3.connect("db.sqlite3") as conn:
-        conn.execute("PRAGMA foreign_keys=ON;")
-        cursor = conn.cursor()
-        cursor.execute("SELECT users.id, users.display_name, users.is_admin, users.birthday, users.email, users.email FROM users JOIN shares ON shares.sender_id = ? WHERE users.id = shares.receiver_id;", (current_user.id, ))
-        bae_row = cursor.fetchone()
-        bae_user = UserRow(*bae_row) if bae_row else None
-    
-    month_calendar = calendar_service.get_month_calendar(
-        year=current_month_object.year, 
-        month=current_month_object.month
-        )
-    
-    month_calendar_dict = {}
-    for date in month_calendar:
-        month_calendar_dict[date] = date
-    
-    # get the start and end of the month for query filters
-    start_of_month = calendar_service.get_start_of_month(year=current_month_object.year, month=current_month_object.month)
-    end_of_month = calendar_service.get_end_of_month(year=current_month_object.year, month=current_month_object.month)
-
-    db_shifts = Shift.list_user_shifts(user_id=current_user.id)
-    db_commitments = Commitment.list_month_for_user(start_of_month=start_of_month, end_of_month=end_of_month, user_id=current_user.id)
-
-    # repackage current user shifts as dict with shift ids as keys to access with .get()
-    shifts_dict = {}
-    for shift in db_shifts:
-        shifts_dict[shift.id] = shift
-        
-    # repackage current user schedule as dict with dates as keys to access with .get()
-    # because neeed to match with shifts in edit view, use shift.id as the key
-    commitments = {}
-    for commitment in db_commitments:
-        date_key = commitment.date.strftime("%Y-%m-%d")
-        shift_id = commitment.shift_id
-        commitments.setdefault(date_key, {})[shift_id] = commitment
-    
-    bae_shifts_dict = {}
-    bae_commitments = {}
-    if bae_user:
-        bae_db_shifts = Shift.list_user_shifts(user_id=bae_user.id)
-        bae_db_commitments = Commitment.list_month_for_user(start_of_month=start_of_month, end_of_month=end_of_month, user_id=bae_user.id)
-
-        # repackage bae shifts as dict with shift ids as keys to access with .get()
-        for shift in bae_db_shifts:
-            bae_shifts_dict[shift.id] = shift
-
-        # repackage bae schedule as dict with dates as keys to access with .get()
-        for commitment in bae_db_commitments:
-            date_key = commitment.date.strftime("%Y-%m-%d")
-            shift_id = commitment.id
-            bae_commitments.setdefault(date_key, {})[shift_id] = commitment
-
     referer = request.headers.get('referer')
     referer_date = None
     if referer:
@@ -105,6 +54,53 @@ def get_calendar(
         if (len(referer_date.split("/")) == 3 or len(referer_date.split("/")) == 4):
             view_transition_day = int(referer.split('/calendar/')[1].split("/")[2])
 
+    holiday_tz_date_today = datetime.datetime.now(tz=ZoneInfo('Asia/Taipei'))
+    iso_date = holiday_tz_date_today.date().isoformat()
+
+    variant = ("calendar", year, month, iso_date, day if show_day else None, "edit" in request.url.path, is_fragment, view_transition_day)
+
+    # answered from the data versions alone, without loading schedules or rendering
+    etag = etags.make_etag(conn=conn, user_id=current_user.id, variant=variant)
+    headers = etags.conditional_headers(etag=etag)
+    if etags.is_not_modified(request=request, etag=etag):
+        return etags.not_modified_response(headers=headers)
+
+    # the etag holds the viewer's and partner's data versions, the header
+    # fields and the holiday version, so a write from any process or
+    # connection leads to a new key, never a stale body
+    cache_key = (current_user.id, etag)
+    cached_html = calendar_cache.get(cache_key)
+    if cached_html is not None:
+        return HTMLResponse(content=cached_html, headers=headers)
+
+    # shared, precomputed grid with ISO keys and prev/next month for the controls
+    month_grid = calendar_service.get_month_grid(year=year, month=month)
+
+    # get the start and end of the month for query filters
+    start_of_month = calendar_service.get_start_of_month(year=current_month_object.year, month=current_month_object.month)
+    end_of_month = calendar_service.get_end_of_month(year=current_month_object.year, month=current_month_object.month)
+
+    # one query for both users' commitments, shift names included
+    month_schedules = load_month_schedules(
+        conn=conn,
+        user_id=current_user.id,
+        start_of_month=start_of_month,
+        end_of_month=end_of_month
+        )
+
+    # the shift list is only needed for the day edit buttons
+    shifts_dict = {}
+    if show_day:
+        for shift in Shift.list_user_shifts(conn=conn, user_id=current_user.id):
+            shifts_dict[shift.id] = shift
+
+    day_cells = build_day_cells(
+        month_grid=month_grid,
+        month_schedules=month_schedules,
+        open_day=day if show_day else None,
+        view_transition_day=view_transition_day
+        )
+
     # for development
     # day = 25
     # year = 2026
@@ -118,49 +114,57 @@ def get_calendar(
     # print(iso_date)
     # end for development
 
-    holiday_tz_date_today = datetime.datetime.now(tz=ZoneInfo('Asia/Taipei'))
-    iso_date = holiday_tz_date_today.date().isoformat()
-
-    with sqlite3.connect("db.sqlite3") as conn:
-        conn.row_factory = sqlite3.Row
+    # holiday modals are outside the grid, fragments skip their queries
+    holiday = None
+    custom_holiday_message = None
+    if not is_fragment:
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
         cursor.execute("SELECT * FROM holiday WHERE iso_date = ?;", (iso_date, ))
         holiday_row = cursor.fetchone()
     
-    holiday = SimpleNamespace(**dict(holiday_row)) if holiday_row else None
+        holiday = SimpleNamespace(**dict(holiday_row)) if holiday_row else None
 
-    message_row = None
-    if holiday:
-        with sqlite3.connect("db.sqlite3") as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+        message_row = None
+        if holiday:
             cursor.execute("SELECT * FROM holiday_message WHERE holiday_id = ? AND recipient_id = ?;", (holiday.holiday_id, current_user.id ))
             message_row = cursor.fetchone()
 
-    custom_holiday_message = SimpleNamespace(**dict(message_row)) if message_row else None
+        custom_holiday_message = SimpleNamespace(**dict(message_row)) if message_row else None
 
     context = CalendarMonthPage(
         current_user=current_user,
-        bae_user=None if not bae_user else bae_user,
         days_of_week=calendar_service.DAYS_OF_WEEK,
         current_month=current_month_object,
-        prev_month_object=prev_month_object,
-        next_month_object=next_month_object,
-        month_calendar=month_calendar_dict,
+        prev_month_object=month_grid.prev_month,
+        next_month_object=month_grid.next_month,
+        day_cells=day_cells,
         shifts=shifts_dict,
-        commitments=commitments,
-        bae_shifts=bae_shifts_dict if bae_shifts_dict else {},
-        bae_commitments=bae_commitments if bae_commitments else {},
+        commitments=month_schedules.commitments,
+        bae_commitments=month_schedules.bae_commitments,
         view_transition_day=view_transition_day,
         birthday_ids=settings.BIRTHDAY_IDS,
         holiday=holiday,
-        custom_holiday_message=custom_holiday_message
+        custom_holiday_message=custom_holiday_message,
+        is_fragment=is_fragment
     )
 
-    response = templates.TemplateResponse(
-        request=request,
-        name="calendar/index.html",
-        context=context,
-    )
+    # the same url returns a page or a fragment depending on HX-Request
+    if is_fragment:
+        with track_render():
+            response = block_templates.TemplateResponse(
+                name="calendar/index.html",
+                context={"request": request, **context},
+                headers=headers,
+                block_name="calendar_month",
+            )
+    else:
+        response = templates.TemplateResponse(
+            request=request,
+            name="calendar/index.html",
+            context=context,
+            headers=headers,
+        )
+    calendar_cache.set(cache_key, response.body)
 
     return response
\ No newline at end of file
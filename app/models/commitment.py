@@ -1,69 +1,108 @@
 from dataclasses import dataclass
-from datetime import datetime
+import datetime
 import sqlite3
 
-from app.viewmodels.structs import ScheduleRow
+from app.core.busy_retry import execute_many_write, execute_write
+from app.models.user import User
+from app.viewmodels.structs import CommitmentShiftRow, ScheduleRow
 
 @dataclass
 class Commitment:
     id: int
     shift_id: int
     user_id: int
-    date: datetime
+    day: str
 
     @classmethod
-    def list_month_for_user(cls, start_of_month: datetime, end_of_month: datetime, user_id: int):
-        with sqlite3.connect("db.sqlite3") as conn:
-            conn.execute("PRAGMA foreign_keys=ON;")
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute("""SELECT id, shift_id, user_id, date
-                            FROM schedules 
-                            WHERE DATE(date) BETWEEN DATE(?) and DATE(?) AND user_id = ?;
-                            """,
-                           (start_of_month, end_of_month, user_id))
-            rows = [Commitment(
-                id=row["id"],
-                shift_id=row["shift_id"],
-                user_id=row["user_id"],
-                date=datetime.strptime(row["date"], "%Y-%m-%d %H:%M:%S")
-            ) for row in cursor.fetchall()]
+    def list_month_for_user(cls, conn: sqlite3.Connection, start_of_month: datetime.date, end_of_month: datetime.date, user_id: int):
+        # day is a plain ISO date, so rows need no parsing and
+        # idx_schedules_user_id_day_shift_id covers the range
+        cursor = conn.cursor()
+        cursor.execute("""SELECT id, shift_id, user_id, day
+                        FROM schedules 
+                        WHERE user_id = ? AND day BETWEEN ? AND ?;
+                        """,
+                       (user_id, start_of_month.strftime("%Y-%m-%d"), end_of_month.strftime("%Y-%m-%d")))
+        rows = [Commitment(*row) for row in cursor.fetchall()]
 
         return rows
     
     @classmethod
-    def get(cls, commitment_id: int):
-        with sqlite3.connect("db.sqlite3") as conn:
-            conn.execute("PRAGMA foreign_keys=ON;")
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            row = cursor.execute("SELECT id, shift_id, user_id, date FROM schedules WHERE id = ?;", (commitment_id, )).fetchone()
+    def list_month_for_user_and_partner(cls, conn: sqlite3.Connection, start_of_month: datetime.date, end_of_month: datetime.date, user_id: int) -> list[CommitmentShiftRow]:
+        """Lists the month's commitments of the user and the user they share with, with shift names."""
+        # the partner is resolved inline so the month view needs one round trip,
+        # each IN value is a separate range on idx_schedules_user_id_day_shift_id
+        cursor = conn.cursor()
+        cursor.execute("""SELECT schedules.id, schedules.shift_id, schedules.user_id, schedules.day, shifts.long_name, shifts.short_name
+                        FROM schedules
+                        JOIN shifts ON shifts.id = schedules.shift_id
+                        WHERE schedules.user_id IN (?, (SELECT receiver_id FROM shares WHERE sender_id = ? LIMIT 1))
+                        AND schedules.day BETWEEN ? AND ?;
+                        """,
+                       (user_id, user_id, start_of_month.strftime("%Y-%m-%d"), end_of_month.strftime("%Y-%m-%d")))
 
-            return Commitment(
-                id=row["id"],
-                shift_id=row["shift_id"],
-                user_id=row["user_id"],
-                date=row["date"]
-                )
+        return [CommitmentShiftRow(*row) for row in cursor.fetchall()]
 
     @classmethod
-    def create(cls, shift_id, user_id, date, return_id: bool = False) -> int:
-        with sqlite3.connect("db.sqlite3") as conn:
-            conn.execute("PRAGMA foreign_keys=ON;")
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO schedules (shift_id, user_id, date) VALUES (?, ?, ?);", (shift_id, user_id, date,))
+    def add(cls, conn: sqlite3.Connection, shift_id: int, user_id: int, day: str) -> CommitmentShiftRow | None:
+        """Commits the user to one of their shifts on day, idempotently, or returns None if it is not theirs."""
+        # one statement checks the shift owner, inserts and reads the shift names
+        rows = execute_write(
+            conn=conn,
+            sql="""INSERT INTO schedules (shift_id, user_id, date, day)
+                SELECT id, user_id, ?, ? FROM shifts WHERE id = ? AND user_id = ?
+                ON CONFLICT (user_id, day, shift_id) DO NOTHING
+                RETURNING id, shift_id, user_id, day,
+                    (SELECT long_name FROM shifts WHERE shifts.id = schedules.shift_id),
+                    (SELECT short_name FROM shifts WHERE shifts.id = schedules.shift_id);""",
+            params=(f"{day} 00:00:00", day, shift_id, user_id),
+        ).fetchall()
+        if rows:
+            User.data_changed(conn=conn, user_id=user_id)
 
-            if return_id:
-                row_id = cursor.lastrowid
+            return CommitmentShiftRow(*rows[0])
 
-                return row_id
-            
+        # already there, or not the user's shift
+        cursor = conn.cursor()
+        cursor.execute("""SELECT schedules.id, schedules.shift_id, schedules.user_id, schedules.day, shifts.long_name, shifts.short_name
+                        FROM schedules
+                        JOIN shifts ON shifts.id = schedules.shift_id
+                        WHERE schedules.user_id = ? AND schedules.day = ? AND schedules.shift_id = ?;
+                        """,
+                       (user_id, day, shift_id))
+        row = cursor.fetchone()
+
+        return CommitmentShiftRow(*row) if row else None
+
+    @classmethod
+    def create_many(cls, conn: sqlite3.Connection, shift_id, user_id, days: list[str]) -> int:
+        """Commits the user to shift_id on every day in days, ISO date strings, and returns how many were added."""
+        # days already holding this shift are skipped, so painting a month twice adds nothing
+        cursor = execute_many_write(
+            conn=conn,
+            sql="""INSERT INTO schedules (shift_id, user_id, date, day) VALUES (?, ?, ?, ?)
+                ON CONFLICT (user_id, day, shift_id) DO NOTHING;""",
+            rows=[(shift_id, user_id, f"{day} 00:00:00", day) for day in days],
+        )
+        if cursor.rowcount:
+            User.data_changed(conn=conn, user_id=user_id)
+
+        return cursor.rowcount
+
+    @classmethod
+    def remove(cls, conn: sqlite3.Connection, commitment_id: int, user_id: int) -> CommitmentShiftRow | None:
+        """Deletes the user's commitment and returns it with the shift names, None when there was none."""
+        rows = execute_write(
+            conn=conn,
+            sql="""DELETE FROM schedules WHERE id = ? AND user_id = ?
+                RETURNING id, shift_id, user_id, day,
+                    (SELECT long_name FROM shifts WHERE shifts.id = schedules.shift_id),
+                    (SELECT short_name FROM shifts WHERE shifts.id = schedules.shift_id);""",
+            params=(commitment_id, user_id),
+        ).fetchall()
+        if not rows:
             return None
-        
 
-    def delete(self):
-        with sqlite3.connect("db.sqlite3") as conn:
-            conn.execute("PRAGMA foreign_keys=ON;")
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM schedules WHERE id = ?;", (self.id, ))
-       
+        User.data_changed(conn=conn, user_id=user_id)
+
+        return CommitmentShiftRow(*rows[0])
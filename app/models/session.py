@@ -2,6 +2,8 @@ from dataclasses import dataclass
 from datetime import datetime
 import sqlite3
 
+from app.core.busy_retry import execute_write
+from app.core.cache import session_cache
 from app.viewmodels.session import SessionCreate
 @dataclass
 class Session:
@@ -12,33 +14,37 @@ class Session:
     created_at: datetime
 
     @classmethod
-    def get_by_token(cls, token: str):
-        with sqlite3.connect("db.sqlite3") as conn:
-            conn.execute("PRAGMA foreign_keys=ON;")
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            row = cursor.execute("SELECT id, token, user_id, expires_at, created_at FROM sessions WHERE token = ?;", (token, )).fetchone()
-
-            return Session(
-                id=row["id"],
-                token=row["token"],
-                user_id=row["user_id"],
-                expires_at=row["expires_at"],
-                created_at=row["created_at"]
-            )
+    def get_by_token(cls, conn: sqlite3.Connection, token: str):
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        row = cursor.execute("SELECT id, token, user_id, expires_at, created_at FROM sessions WHERE token = ?;", (token, )).fetchone()
+        if not row:
+            return None
+
+        return Session(
+            id=row["id"],
+            token=row["token"],
+            user_id=row["user_id"],
+            expires_at=row["expires_at"],
+            created_at=row["created_at"]
+        )
 
     @classmethod
-    def create(cls, data: SessionCreate):
-        with sqlite3.connect("db.sqlite3") as conn:
-            conn.execute("PRAGMA foreign_keys=ON;")
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO sessions (token, user_id, expires_at) VALUES (?, ?, ?)", (data.token, data.user_id, data.expires_at))
-
-    def delete(self):
-        with sqlite3.connect("db.sqlite3") as conn:
-            conn.execute("PRAGMA foreign_key=ON;")
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM sessions WHERE id = ?", (self.id, ))
+    def create(cls, conn: sqlite3.Connection, data: SessionCreate):
+        execute_write(conn=conn, sql="INSERT INTO sessions (token, user_id, expires_at) VALUES (?, ?, ?)", params=(data.token, data.user_id, data.expires_at))
+
+    @classmethod
+    def delete_expired(cls, conn: sqlite3.Connection, now: int, batch_size: int) -> int:
+        """Deletes up to batch_size expired sessions and returns how many were deleted."""
+        cursor = execute_write(conn=conn, sql="""DELETE FROM sessions
+                       WHERE id IN (SELECT id FROM sessions WHERE expires_at <= ? LIMIT ?);
+                       """, params=(now, batch_size))
+
+        return cursor.rowcount
+
+    def delete(self, conn: sqlite3.Connection):
+        execute_write(conn=conn, sql="DELETE FROM sessions WHERE id = ?", params=(self.id, ))
+        session_cache.delete(self.token)
 
 
     # def generate_session_token():
@@ -4,6 +4,8 @@ import sqlite3
 
 from fastapi.datastructures import FormData
 
+from app.core.busy_retry import execute_write
+from app.core.cache import invalidate_calendar_months
 from app.viewmodels.user import CurrentUser
 
 @dataclass
@@ -23,63 +25,57 @@ class User:
     verified_at: datetime
     created_at: datetime
     updated_at: datetime
+    data_version: int = 0
 
     @classmethod
-    def get_current_user(cls, user_id):
-        with sqlite3.connect("db.sqlite3") as conn:
-            conn.execute("PRAGMA foreign_keys = ON;")
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            row = cursor.execute("SELECT id, display_name, email, birthday, username, is_admin FROM users WHERE id = ?;", (user_id, )).fetchone()
+    def get_current_user(cls, conn: sqlite3.Connection, user_id):
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        row = cursor.execute("SELECT id, display_name, email, birthday, username, is_admin FROM users WHERE id = ?;", (user_id, )).fetchone()
 
-            if not row:
-                return None
+        if not row:
+            return None
 
-            user = CurrentUser.from_row(row=row)
+        user = CurrentUser.from_row(row=row)
 
-            return user
+        return user
 
     @classmethod
-    def get(cls, user_id):
+    def get(cls, conn: sqlite3.Connection, user_id):
         """Returns User instance."""
-        with sqlite3.connect("db.sqlite3") as conn:
-            conn.execute("PRAGMA foreign_keys = ON;")
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            row = cursor.execute("SELECT * FROM users WHERE id = ?;", (user_id, )).fetchone()
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        row = cursor.execute("SELECT * FROM users WHERE id = ?;", (user_id, )).fetchone()
 
-            if not row:
-                return None
+        if not row:
+            return None
 
-            user = User(**row)
+        user = User(**row)
 
-            return user
+        return user
         
     @classmethod
-    def username_exists(cls, username) -> bool:
-        with sqlite3.connect("db.sqlite3") as conn:
-            conn.execute("PRAGMA foreign_keys = ON;")
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            row = cursor.execute("SELECT EXISTS(SELECT 1 FROM users WHERE username = ?);", (username, )).fetchone()
-            
-            return bool(row[0])
+    def data_changed(cls, conn: sqlite3.Connection, user_id: int):
+        """Bumps the user's data_version, which page ETags are built from, and drops their cached months."""
+        execute_write(conn=conn, sql="UPDATE users SET data_version = data_version + 1 WHERE id = ?;", params=(user_id, ))
+        invalidate_calendar_months(conn=conn, user_id=user_id)
 
-    def update(self, form_data: FormData):
+    @classmethod
+    def username_exists(cls, conn: sqlite3.Connection, username) -> bool:
+        cursor = conn.cursor()
+        row = cursor.execute("SELECT EXISTS(SELECT 1 FROM users WHERE username = ?);", (username, )).fetchone()
+        
+        return bool(row[0])
+
+    def update(self, conn: sqlite3.Connection, form_data: FormData):
         if form_data.get("display_name"):
-            with sqlite3.connect("db.sqlite3") as conn:
-                conn.execute("PRAGMA foreign_keys=ON;")
-                cursor = conn.cursor()
-                cursor.execute("UPDATE users SET display_name = ? WHERE id = ?;", (form_data.get("display_name"), self.id))
+            execute_write(conn=conn, sql="UPDATE users SET display_name = ? WHERE id = ?;", params=(form_data.get("display_name"), self.id))
             
         if form_data.get("app_username"):
-            with sqlite3.connect("db.sqlite3") as conn:
-                conn.execute("PRAGMA foreign_keys=ON;")
-                cursor = conn.cursor()
-                cursor.execute("UPDATE users SET username = ? WHERE id = ?;", (form_data.get("app_username"), self.id))
+            execute_write(conn=conn, sql="UPDATE users SET username = ? WHERE id = ?;", params=(form_data.get("app_username"), self.id))
         
         if form_data.get("birthday"):
-            with sqlite3.connect("db.sqlite3") as conn:
-                conn.execute("PRAGMA foreign_keys=ON;")
-                cursor = conn.cursor()
-                cursor.execute("UPDATE users SET birthday = ? WHERE id = ?;", (form_data.get("birthday"), self.id))
\ No newline at end of file
+            execute_write(conn=conn, sql="UPDATE users SET birthday = ? WHERE id = ?;", params=(form_data.get("birthday"), self.id))
+
+        # the calendar header shows the display name
+        User.data_changed(conn=conn, user_id=self.id)
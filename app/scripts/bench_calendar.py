@@ -0,0 +1,99 @@
+"""Benchmark requests/sec on the calendar month route.
+
+Runs the same GET /calendar/{year}/{month} request with a connection per
+call (pool size 0, the old behaviour) and with the connection pool, then
+prints requests/sec for both. Needs a valid session token from db.sqlite3.
+
+    python -m app.scripts.bench_calendar --token <session-id> --year 2026 --month 1
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.core.connection_pool import DEFAULT_POOL_SIZE, pool
+from main import app
+
+
+async def request_calendar(path: str, token: str) -> int:
+    """Sends one request straight to the ASGI app and returns the status code."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"localhost"),
+            (b"cookie", f"session-id={token}".encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+    }
+    status = {}
+    request_sent = False
+    response_complete = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body"):
+            response_complete.set()
+
+    await app(scope, receive, send)
+
+    return status["code"]
+
+
+async def run(path: str, token: str, requests: int) -> float:
+    """Returns requests/sec for `requests` sequential requests."""
+    # warm up templates and the pool
+    await request_calendar(path=path, token=token)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        status = await request_calendar(path=path, token=token)
+        if status != 200:
+            raise RuntimeError(f"{path} returned {status}")
+    elapsed = time.perf_counter() - start
+
+    return requests / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--year", type=int, default=2026)
+    parser.add_argument("--month", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    path = f"/calendar/{args.year}/{args.month}"
+
+    pool.max_size = 0
+    pool.close_all()
+    before = asyncio.run(run(path=path, token=args.token, requests=args.requests))
+
+    pool.max_size = DEFAULT_POOL_SIZE
+    after = asyncio.run(run(path=path, token=args.token, requests=args.requests))
+
+    print(f"{path} x {args.requests}")
+    print(f"connection per call: {before:8.1f} req/s")
+    print(f"pooled connections:  {after:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark rendering the calendar month view for a fully booked month.
+
+Both partners have a shift on every day of the month, the partner has two
+on every other day. Times building the day cells and rendering
+calendar/index.html separately, no database or HTTP involved.
+
+    python -m app.scripts.bench_calendar_render --renders 2000
+"""
+
+import argparse
+import time
+from types import SimpleNamespace
+
+from app.core.template_utils import templates
+from app.services import calendar_service
+from app.services.calendar_loader import MonthSchedules, build_day_cells
+from app.viewmodels.pages import CalendarMonthPage
+from app.viewmodels.structs import CommitmentShiftRow, UserRow
+
+
+def booked_month(month_grid: calendar_service.MonthGrid) -> MonthSchedules:
+    """Returns a month where every day is booked for both users."""
+    schedules = MonthSchedules()
+    row_id = 0
+    for iso, date in month_grid.month_dates.items():
+        row_id += 1
+        schedules.commitments[iso] = {1: CommitmentShiftRow(row_id, 1, 1, iso, "Day shift", "DS")}
+        partner_shifts = (2, 3) if date.day % 2 else (2,)
+        for shift_id in partner_shifts:
+            row_id += 1
+            schedules.bae_commitments.setdefault(iso, {})[shift_id] = CommitmentShiftRow(row_id, shift_id, 2, iso, "Night shift", f"N{shift_id}")
+
+    return schedules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--year", type=int, default=2026)
+    parser.add_argument("--month", type=int, default=1)
+    parser.add_argument("--renders", type=int, default=2000)
+    args = parser.parse_args()
+
+    month_grid = calendar_service.get_month_grid(year=args.year, month=args.month)
+    month_schedules = booked_month(month_grid=month_grid)
+    template = templates.get_template("calendar/index.html")
+    request = SimpleNamespace(path=f"/calendar/{args.year}/{args.month}", path_params={})
+    current_user = UserRow(1, "Al", False, None, None, "a@example.com")
+
+    start = time.perf_counter()
+    for _ in range(args.renders):
+        day_cells = build_day_cells(month_grid=month_grid, month_schedules=month_schedules)
+    build_ms = (time.perf_counter() - start) / args.renders * 1000
+
+    context = CalendarMonthPage(
+        request=request,
+        current_user=current_user,
+        days_of_week=calendar_service.DAYS_OF_WEEK,
+        current_month=month_grid.first_day,
+        prev_month_object=month_grid.prev_month,
+        next_month_object=month_grid.next_month,
+        day_cells=day_cells,
+        shifts={},
+        commitments=month_schedules.commitments,
+        bae_commitments=month_schedules.bae_commitments,
+        view_transition_day=None,
+        birthday_ids=[],
+        holiday=None,
+        custom_holiday_message=None
+    )
+    # warm up the template cache
+    template.render(context)
+
+    start = time.perf_counter()
+    for _ in range(args.renders):
+        template.render(context)
+    render_ms = (time.perf_counter() - start) / args.renders * 1000
+
+    print(f"{month_grid.first_day:%B %Y}, {len(day_cells)} cells x {args.renders}")
+    print(f"build day cells:  {build_ms:8.3f} ms")
+    print(f"render template:  {render_ms:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Benchmark per-request overhead of the middleware stack.
+
+Sends the same request straight to a one-route app bare, behind two
+pass-through BaseHTTPMiddleware layers (the shape of the old closing down
+and maintenance stack) and behind GateMiddleware, then prints the time per
+request and the overhead over the bare app.
+
+    python -m app.scripts.bench_middleware --requests 20000
+"""
+
+import argparse
+import asyncio
+import time
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.core.middleware import GateMiddleware
+
+
+class PassThroughMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        return await call_next(request)
+
+
+async def ping(request):
+    return PlainTextResponse("pong")
+
+
+def build_app(middleware: list) -> Starlette:
+    return Starlette(routes=[Route("/ping", ping)], middleware=middleware)
+
+
+async def send_request(app, path: str) -> int:
+    """Sends one GET straight to the ASGI app and returns the status code."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+    }
+    status = {}
+    request_sent = False
+    response_complete = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body"):
+            response_complete.set()
+
+    await app(scope, receive, send)
+
+    return status["code"]
+
+
+async def run(app, requests: int) -> float:
+    """Returns microseconds per request."""
+    await send_request(app=app, path="/ping")
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        status = await send_request(app=app, path="/ping")
+        if status != 200:
+            raise RuntimeError(f"/ping returned {status}")
+
+    return (time.perf_counter() - start) / requests * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    stacks = {
+        "no middleware": [],
+        "2x BaseHTTPMiddleware": [Middleware(PassThroughMiddleware), Middleware(PassThroughMiddleware)],
+        "GateMiddleware": [Middleware(GateMiddleware)],
+    }
+    results = {name: asyncio.run(run(app=build_app(middleware), requests=args.requests)) for name, middleware in stacks.items()}
+
+    bare = results["no middleware"]
+    print(f"GET /ping x {args.requests}")
+    for name, per_request in results.items():
+        print(f"{name:24} {per_request:8.1f} us/request  (+{per_request - bare:6.1f} us)")
+
+
+if __name__ == "__main__":
+    main()
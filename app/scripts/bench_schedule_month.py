@@ -0,0 +1,116 @@
+"""Benchmark the month range query on a large schedules table.
+
+Builds a throwaway database from the yoyo migrations, fills schedules with
+`--rows` commitments and compares the old DATE(date) query without an index
+against the day column query on idx_schedules_user_id_day_shift_id. Exits
+non-zero if the month query plan does not use the index.
+
+    python -m app.scripts.bench_schedule_month --rows 1000000
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from yoyo import get_backend, read_migrations
+
+from app.services import calendar_service
+
+OLD_QUERY = """SELECT id, shift_id, user_id, date FROM schedules
+    WHERE DATE(date) BETWEEN DATE(?) and DATE(?) AND user_id = ?;"""
+NEW_QUERY = """SELECT id, shift_id, user_id, day FROM schedules
+    WHERE user_id = ? AND day BETWEEN ? AND ?;"""
+
+
+def build_database(path: str):
+    """Applies every yoyo migration to a new database file."""
+    backend = get_backend(f"sqlite:///{path}")
+    migrations = read_migrations("migrations")
+    with backend.lock():
+        backend.apply_migrations(backend.to_apply(migrations))
+
+
+def seed(conn: sqlite3.Connection, rows: int, users: int):
+    """Inserts users, one shift each and `rows` schedules spread over three years."""
+    conn.executemany(
+        "INSERT INTO users (id, email, hashed_password) VALUES (?, ?, 'x');",
+        ((user_id, f"user{user_id}@example.com") for user_id in range(1, users + 1)),
+    )
+    conn.executemany(
+        "INSERT INTO shifts (id, long_name, short_name, user_id) VALUES (?, 'Day shift', 'DS', ?);",
+        ((user_id, user_id) for user_id in range(1, users + 1)),
+    )
+    first_day = datetime.date(2024, 1, 1)
+    days = ((i % users + 1, (first_day + datetime.timedelta(days=i // users)).isoformat()) for i in range(rows))
+    conn.executemany(
+        "INSERT INTO schedules (shift_id, user_id, date, day) VALUES (?, ?, ?, ?);",
+        ((user_id, user_id, f"{day} 00:00:00", day) for user_id, day in days),
+    )
+    conn.commit()
+
+
+def month_params(rng: random.Random, users: int):
+    year = rng.choice([2024, 2025, 2026])
+    month = rng.randint(1, 12)
+    start = calendar_service.get_start_of_month(year=year, month=month)
+    end = calendar_service.get_end_of_month(year=year, month=month)
+    return rng.randint(1, users), start, end
+
+
+def time_queries(conn: sqlite3.Connection, query: str, lookups: list, old: bool) -> float:
+    start = time.perf_counter()
+    for user_id, start_of_month, end_of_month in lookups:
+        if old:
+            params = (start_of_month.strftime("%Y-%m-%d %H:%M:%S"), end_of_month.strftime("%Y-%m-%d %H:%M:%S"), user_id)
+        else:
+            params = (user_id, start_of_month.strftime("%Y-%m-%d"), end_of_month.strftime("%Y-%m-%d"))
+        conn.execute(query, params).fetchall()
+    return (time.perf_counter() - start) / len(lookups) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    lookups = [month_params(rng=rng, users=args.users) for _ in range(args.lookups)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.sqlite3")
+        build_database(path=path)
+
+        conn = sqlite3.connect(path)
+        seed(conn=conn, rows=args.rows, users=args.users)
+        conn.execute("ANALYZE;")
+
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {NEW_QUERY}", (1, "2026-01-01", "2026-01-31")).fetchall()
+        print("month query plan:", " / ".join(row[3] for row in plan))
+        uses_index = any("idx_schedules_user_id_day_shift_id" in row[3] for row in plan)
+
+        new_ms = time_queries(conn=conn, query=NEW_QUERY, lookups=lookups, old=False)
+
+        conn.execute("DROP INDEX idx_schedules_user_id_day_shift_id;")
+        old_plan = conn.execute(f"EXPLAIN QUERY PLAN {OLD_QUERY}", ("2026-01-01", "2026-01-31", 1)).fetchall()
+        print("old query plan:  ", " / ".join(row[3] for row in old_plan))
+        old_ms = time_queries(conn=conn, query=OLD_QUERY, lookups=lookups, old=True)
+        conn.close()
+
+    print(f"{args.rows} schedules, {args.lookups} month lookups")
+    print(f"DATE(date) without index: {old_ms:8.3f} ms/query")
+    print(f"user_id, day index:       {new_ms:8.3f} ms/query")
+
+    if not uses_index:
+        print("month query does not use idx_schedules_user_id_day_shift_id")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Benchmark concurrent reads and writes under two connection profiles.
+
+Builds a database from the yoyo migrations for each profile, seeds it and
+starts `--readers` and `--writers` processes, the way several uvicorn
+workers share db.sqlite3. Readers run the calendar month query, writers
+run the shape of schedule.create (BEGIN, read, insert, commit) and delete
+what they inserted. Prints reads and writes per second, read p99 and how
+many reads and write transactions failed with "database is locked", first
+with the old rollback journal and then with the profile from Settings.
+
+Writers open their transactions with a plain BEGIN like get_db does. A
+deferred transaction that reads and then writes cannot wait for the
+write lock (that could deadlock), so it fails at once when another
+writer holds the lock, whatever busy_timeout is. --begin immediate takes
+the write lock up front, so writers queue on busy_timeout instead.
+
+    python -m app.scripts.bench_sqlite_profile --seconds 5 --readers 4 --writers 2
+"""
+
+import argparse
+import datetime
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from app.core.config import get_settings
+from app.core.sqlite_profile import ConnectionProfile
+from app.scripts.bench_schedule_month import build_database, seed
+
+# sqlite's own defaults, what every connection used before
+ROLLBACK_JOURNAL = ConnectionProfile(
+    journal_mode="delete",
+    synchronous="full",
+    busy_timeout_ms=5000,
+    mmap_size=0,
+    cache_size_kib=2000,
+    temp_store="default",
+)
+
+BEGIN = {"deferred": "BEGIN;", "immediate": "BEGIN IMMEDIATE;"}
+
+MONTH_QUERY = """SELECT schedules.id, schedules.shift_id, schedules.user_id, schedules.day, shifts.long_name, shifts.short_name
+    FROM schedules JOIN shifts ON shifts.id = schedules.shift_id
+    WHERE schedules.user_id IN (?, (SELECT receiver_id FROM shares WHERE sender_id = ? LIMIT 1))
+    AND schedules.day BETWEEN ? AND ?;"""
+
+
+def read_loop(path: str, profile: ConnectionProfile, users: int, deadline: float, seed_value: int, results):
+    rng = random.Random(seed_value)
+    conn = profile.connect(path)
+    reads = locked = 0
+    latencies = []
+    while time.time() < deadline:
+        user_id = rng.randint(1, users)
+        month = rng.randint(1, 12)
+        start = time.perf_counter()
+        try:
+            conn.execute(MONTH_QUERY, (user_id, user_id, f"2025-{month:02d}-01", f"2025-{month:02d}-31")).fetchall()
+        except sqlite3.OperationalError:
+            locked += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+        reads += 1
+    conn.close()
+    results.put(("read", reads, locked, latencies))
+
+
+def write_loop(path: str, profile: ConnectionProfile, users: int, deadline: float, seed_value: int, begin: str, results):
+    rng = random.Random(seed_value)
+    conn = profile.connect(path, isolation_level=None)
+    writes = locked = 0
+    while time.time() < deadline:
+        user_id = rng.randint(1, users)
+        day = (datetime.date(2025, 1, 1) + datetime.timedelta(days=rng.randint(0, 364))).isoformat()
+        try:
+            conn.execute(begin)
+            conn.execute("SELECT id FROM schedules WHERE user_id = ? AND day = ?;", (user_id, day)).fetchall()
+            schedule_id = conn.execute(
+                "INSERT INTO schedules (shift_id, user_id, date, day) VALUES (?, ?, ?, ?);",
+                (user_id, user_id, f"{day} 00:00:00", day),
+            ).lastrowid
+            conn.execute("DELETE FROM schedules WHERE id = ?;", (schedule_id, ))
+            conn.execute("COMMIT;")
+        except sqlite3.OperationalError:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK;")
+            locked += 1
+            continue
+        writes += 1
+    conn.close()
+    results.put(("write", writes, locked, []))
+
+
+def run(profile: ConnectionProfile, args) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.sqlite3")
+        build_database(path=path)
+        conn = sqlite3.connect(path)
+        seed(conn=conn, rows=args.rows, users=args.users)
+        conn.execute("INSERT INTO shares (sender_id, receiver_id) SELECT id, id + 1 FROM users WHERE id % 2 = 1 AND id < ?;", (args.users, ))
+        conn.commit()
+        conn.close()
+
+        # sets journal_mode once before the workers start
+        profile.connect(path).close()
+
+        results = multiprocessing.Queue()
+        deadline = time.time() + args.seconds
+        processes = [
+            multiprocessing.Process(target=read_loop, args=(path, profile, args.users, deadline, i, results))
+            for i in range(args.readers)
+        ] + [
+            multiprocessing.Process(target=write_loop, args=(path, profile, args.users, deadline, 1000 + i, BEGIN[args.begin], results))
+            for i in range(args.writers)
+        ]
+        for process in processes:
+            process.start()
+        totals = {"read": 0, "write": 0, "read_locked": 0, "write_locked": 0, "latencies": []}
+        for _ in processes:
+            kind, count, locked, latencies = results.get()
+            totals[kind] += count
+            totals[f"{kind}_locked"] += locked
+            totals["latencies"] += latencies
+        for process in processes:
+            process.join()
+
+    latencies = sorted(totals["latencies"])
+    totals["p99_ms"] = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0
+
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--begin", choices=BEGIN, default="deferred")
+    args = parser.parse_args()
+
+    profiles = {
+        "rollback journal": ROLLBACK_JOURNAL,
+        "settings profile": ConnectionProfile.from_settings(get_settings()),
+    }
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:g} s, {args.rows} schedules, {args.begin} writes")
+    for name, profile in profiles.items():
+        totals = run(profile=profile, args=args)
+        print(
+            f"{name:17} {profile.journal_mode:>6}/{profile.synchronous:<6}"
+            f" {totals['read'] / args.seconds:9.0f} reads/s {totals['write'] / args.seconds:7.0f} writes/s"
+            f"  read p99 {totals['p99_ms']:7.2f} ms  locked reads {totals['read_locked']} writes {totals['write_locked']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
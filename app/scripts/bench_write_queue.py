@@ -0,0 +1,104 @@
+"""Benchmark schedule writes from many threads, one transaction each vs the write queue.
+
+Builds a database from the yoyo migrations and has `--threads` threads each
+create `--writes` commitments with Commitment.add, the way concurrent
+requests do. Each write either runs in its own pooled connection and
+transaction (how requests wrote before) or goes through a WriteQueue that
+group commits them. Runs with synchronous=NORMAL (the default profile) and
+synchronous=FULL, where every commit waits for an fsync.
+
+    python -m app.scripts.bench_write_queue --threads 16 --writes 200
+"""
+
+import argparse
+import dataclasses
+import datetime
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from app.core.config import get_settings
+from app.core.connection_pool import ConnectionPool
+from app.core.sqlite_profile import ConnectionProfile
+from app.core.write_queue import WriteQueue
+from app.models.commitment import Commitment
+from app.scripts.bench_schedule_month import build_database, seed
+
+
+def commitment_days(thread: int, writes: int):
+    first_day = datetime.date(2030, 1, 1)
+    return [(first_day + datetime.timedelta(days=thread * writes + i)).isoformat() for i in range(writes)]
+
+
+def own_transactions(pool: ConnectionPool, user_id: int, days: list):
+    for day in days:
+        with pool.connection() as conn:
+            Commitment.add(conn=conn, shift_id=user_id, user_id=user_id, day=day)
+
+
+def queued(write_queue: WriteQueue, user_id: int, days: list):
+    for day in days:
+        write_queue.execute(Commitment.add, shift_id=user_id, user_id=user_id, day=day)
+
+
+def run(profile: ConnectionProfile, mode: str, args) -> float:
+    """Returns writes per second."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.sqlite3")
+        build_database(path=path)
+        conn = sqlite3.connect(path)
+        seed(conn=conn, rows=args.threads, users=args.threads)
+        conn.close()
+
+        pool = ConnectionPool(path, profile=profile, max_size=args.threads)
+        write_queue = WriteQueue(pool=pool, max_delay=args.delay_ms / 1000, max_batch=args.max_batch)
+        if mode == "own transaction":
+            target, first_arg = own_transactions, pool
+        else:
+            target, first_arg = queued, write_queue
+
+        threads = [
+            threading.Thread(target=target, args=(first_arg, thread + 1, commitment_days(thread=thread, writes=args.writes)))
+            for thread in range(args.threads)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        write_queue.close()
+        pool.close_all()
+
+        conn = sqlite3.connect(path)
+        written = conn.execute("SELECT COUNT(*) FROM schedules WHERE day >= '2030-01-01';").fetchone()[0]
+        conn.close()
+        if written != args.threads * args.writes:
+            raise RuntimeError(f"{mode}: {written} of {args.threads * args.writes} writes stored")
+
+    return args.threads * args.writes / elapsed
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--delay-ms", type=float, default=float(settings.WRITE_QUEUE_DELAY_MS))
+    parser.add_argument("--max-batch", type=int, default=int(settings.WRITE_QUEUE_MAX_BATCH))
+    args = parser.parse_args()
+
+    settings_profile = ConnectionProfile.from_settings(settings)
+    print(f"{args.threads} threads x {args.writes} Commitment.add")
+    for synchronous in ("normal", "full"):
+        profile = dataclasses.replace(settings_profile, synchronous=synchronous)
+        for mode in ("own transaction", "write queue"):
+            per_second = run(profile=profile, mode=mode, args=args)
+            print(f"{profile.journal_mode}/{synchronous:6} {mode:16} {per_second:8.0f} writes/s")
+
+
+if __name__ == "__main__":
+    main()
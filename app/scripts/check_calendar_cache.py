@@ -0,0 +1,124 @@
+"""Check that a cached calendar month is never served after another process writes.
+
+Builds a throwaway database from the yoyo migrations, points the
+connection pool at it and renders a month twice through the app, so the
+second view comes from the rendered-month cache. A separate process then
+writes the way another uvicorn worker would: it schedules a shift for
+the viewer and one for their partner, renames the viewer without bumping
+their data version and adds a holiday. That process's cache invalidation
+never reaches this one. After each write the month is asked for again
+with the old ETag in If-None-Match and must come back 200 with a new
+ETag and a body showing the change.
+
+Exits non-zero when a stale month or a 304 is served.
+
+    python -m app.scripts.check_calendar_cache
+"""
+
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+
+from app.scripts.bench_schedule_month import build_database, seed
+from app.scripts.check_query_plans import ADMIN_TOKEN, seed_app_data
+
+MONTH_URL = "/calendar/2030/1"
+
+
+def schedule_shift(conn: sqlite3.Connection, user_id: int, short_name: str, day: str):
+    from app.models.commitment import Commitment
+    from app.models.shift import Shift
+
+    shift_id = Shift.create(conn=conn, long_name=f"Shift {short_name}", short_name=short_name, user_id=user_id)
+    Commitment.add(conn=conn, shift_id=shift_id, user_id=user_id, day=day)
+
+
+def rename_user(conn: sqlite3.Connection, user_id: int, display_name: str):
+    conn.execute("UPDATE users SET display_name = ? WHERE id = ?;", (display_name, user_id))
+
+
+def add_holiday(conn: sqlite3.Connection, iso_date: str):
+    conn.execute("INSERT INTO holiday (name, iso_date, template_name) VALUES ('Check', ?, 'holidays/christmas-modal.html');", (iso_date, ))
+
+
+def write_from_other_process(path: str, write, kwargs: dict):
+    conn = sqlite3.connect(path)
+    with conn:
+        write(conn=conn, **kwargs)
+    conn.close()
+
+
+def write_and_check(client, path: str, etag: str, write, kwargs: dict, shows: str = None) -> tuple[str, list]:
+    """Writes in a child process, then fetches the month. Returns the new ETag and any failures."""
+    name = f"{write.__name__}{tuple(kwargs.values())}"
+    process = multiprocessing.Process(target=write_from_other_process, args=(path, write, kwargs))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        return etag, [f"{name}: writer exited with {process.exitcode}"]
+
+    failures = []
+    response = client.get(MONTH_URL, headers={"If-None-Match": etag})
+    if response.status_code != 200:
+        failures.append(f"{name}: got {response.status_code} for the old ETag")
+    elif response.headers["etag"] == etag:
+        failures.append(f"{name}: ETag did not change")
+    elif shows and shows not in response.text:
+        failures.append(f"{name}: new ETag but the month does not show {shows}, stale cached body")
+
+    return response.headers.get("etag", etag), failures
+
+
+def main():
+    from fastapi.testclient import TestClient
+
+    from app.core.cache import calendar_cache
+    from app.core.connection_pool import pool
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cache.sqlite3")
+        build_database(path=path)
+        conn = sqlite3.connect(path)
+        seed(conn=conn, rows=0, users=2)
+        seed_app_data(conn=conn, users=2)
+        conn.close()
+
+        pool.close_all()
+        pool.database = path
+        calendar_cache.clear()
+
+        from main import app
+
+        client = TestClient(app)
+        client.cookies.set("session-id", ADMIN_TOKEN)
+
+        etag = client.get(MONTH_URL).headers["etag"]
+        hits = calendar_cache.hits
+        client.get(MONTH_URL)
+        failures = [] if calendar_cache.hits > hits else ["second view was not served from the cache, nothing checked"]
+
+        # the viewer's own write, the partner's, then the header and holidays
+        writes = (
+            (schedule_shift, {"user_id": 1, "short_name": "QZOWN", "day": "2030-01-15"}, "QZOWN"),
+            (schedule_shift, {"user_id": 2, "short_name": "QZBAE", "day": "2030-01-16"}, "QZBAE"),
+            (rename_user, {"user_id": 1, "display_name": "QZNAME"}, "QZNAME"),
+            (add_holiday, {"iso_date": "2030-01-01"}, None),
+        )
+        for write, kwargs, shows in writes:
+            etag, write_failures = write_and_check(client=client, path=path, etag=etag, write=write, kwargs=kwargs, shows=shows)
+            failures += write_failures
+
+        pool.close_all()
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+
+    print("months written by another process are rendered fresh")
+
+
+if __name__ == "__main__":
+    main()
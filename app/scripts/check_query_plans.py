@@ -0,0 +1,247 @@
+"""Check the query plan of every statement the app runs.
+
+Builds a throwaway database from the yoyo migrations, seeds it, points the
+connection pool at it and sends a signed out and a signed in crawl of
+every route in router.routes through the real middleware, dependencies
+and handlers, then runs one expired session sweep. Every statement is
+caught by the slow query log with its threshold at 0, which records the
+normalized SQL, the caller and the EXPLAIN QUERY PLAN.
+
+Exits non-zero if a hot-path statement (sessions by token or expiry,
+schedules by user and month, shares by sender, holiday by iso_date,
+shifts by user) scans a table, if the crawl no longer runs one of them or
+if a route is missing from the crawl. Other scans are listed only.
+tests/test_query_plans.py runs the same check under pytest.
+
+    python -m app.scripts.check_query_plans --verbose
+"""
+
+import argparse
+import datetime
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+
+from app.scripts.bench_schedule_month import build_database, seed
+
+ADMIN_TOKEN = "plan-check-admin"
+PARTNER_TOKEN = "plan-check-partner"
+# an extra shift of the admin's for the crawl to delete
+SPARE_SHIFT_ID = 1_000_000
+CRAWL_EMAIL = "crawl@example.com"
+CRAWL_PASSWORD = "crawl-password"
+CRAWL_PROFILE = "crawl.prof"
+
+# name -> pattern over the normalized SQL
+HOT_PATHS = {
+    "sessions by token": re.compile(r"\bFROM sessions\b.*\btoken = \?"),
+    "sessions by expiry": re.compile(r"\bFROM sessions WHERE expires_at <= \?"),
+    "schedules by user and month": re.compile(r"\bFROM schedules\b.*\bday BETWEEN \? AND \?"),
+    "shares by sender": re.compile(r"\bshares\b.*\bsender_id = (\?|users\.id)"),
+    "holiday by iso_date": re.compile(r"\bFROM holiday WHERE iso_date = \?"),
+    "shifts by user": re.compile(r"\bFROM shifts WHERE user_id = \?"),
+}
+
+# (method, path, htmx, form data), sent signed out
+GUEST_CRAWL = (
+    ("GET", "/", False, None),
+    ("GET", "/signup", False, None),
+    ("POST", "/signup", True, {"username": CRAWL_EMAIL, "password": CRAWL_PASSWORD}),
+    ("GET", "/signin", False, None),
+    ("POST", "/signin", True, {"username": CRAWL_EMAIL, "password": CRAWL_PASSWORD}),
+)
+
+# sent signed in as the admin, /signout last since it ends the session
+CRAWL = (
+    ("GET", "/calendar/2026/3", False, None),
+    ("GET", "/calendar/2026/3", True, None),
+    ("GET", "/calendar/2026/3/5", False, None),
+    ("GET", "/calendar/2026/3/5/edit", False, None),
+    ("GET", "/birthday-modal", True, None),
+    ("GET", "/scheduling", False, None),
+    ("GET", "/scheduling/2026/3", False, None),
+    ("POST", "/scheduling", True, {"shift": "1", "date": "2026-03-30"}),
+    ("POST", "/scheduling/many", True, {"shift": "1", "start": "2026-04-01", "end": "2026-04-30", "weekday": ["0", "3"]}),
+    ("DELETE", "/scheduling/1", True, None),
+    ("DELETE", "/close-modal", True, None),
+    ("DELETE", "/modal-close", True, None),
+    ("GET", "/shifts", False, None),
+    ("GET", "/shifts/new", False, None),
+    ("POST", "/shifts/new", True, {"shift_name": "Crawl shift"}),
+    ("GET", "/shifts/1/edit", False, None),
+    ("POST", "/shifts/1/edit", True, {"long_name": "Day shift", "short_name": "DS"}),
+    ("DELETE", f"/shifts/{SPARE_SHIFT_ID}", True, None),
+    ("GET", "/profile", False, None),
+    ("PUT", "/users/1", True, {"display_name": "Admin"}),
+    ("POST", "/username-unique", True, {"app_username": "crawl"}),
+    ("GET", "/admin", False, None),
+    ("POST", "/admin/flags/MAINTENANCE_MODE", False, {"value": "false"}),
+    ("GET", "/admin/users", False, None),
+    ("GET", "/admin/signins", False, None),
+    ("GET", "/admin/metrics", False, None),
+    ("GET", "/admin/slow-queries", False, None),
+    ("GET", "/admin/profiles", False, None),
+    ("POST", "/admin/profiles/cookie", False, {"value": "false"}),
+    ("GET", f"/admin/profiles/{CRAWL_PROFILE}", False, None),
+    ("GET", "/signout", False, None),
+)
+
+
+def seed_app_data(conn: sqlite3.Connection, users: int):
+    """Adds what the crawl needs on top of the schedules seed.
+
+    Tables are filled to production-like sizes, since with a handful of
+    rows sqlite rightly prefers a scan over an index. User 1 is an admin
+    sharing with user 2 and has a spare shift, every user has a few
+    sessions, users share in pairs and there is a holiday every day of
+    three years.
+    """
+    expires_at = int(time.time()) + 3600
+    conn.execute("UPDATE users SET is_admin = 1, display_name = 'Admin' WHERE id = 1;")
+    conn.execute("INSERT INTO shifts (id, long_name, short_name, user_id) VALUES (?, 'Spare shift', 'SP', 1);", (SPARE_SHIFT_ID, ))
+    conn.executemany(
+        "INSERT INTO shares (sender_id, receiver_id) VALUES (?, ?);",
+        ((user_id, user_id + 1 - 2 * ((user_id + 1) % 2)) for user_id in range(1, users + 1 - users % 2)),
+    )
+    conn.executemany(
+        "INSERT INTO sessions (token, user_id, expires_at) VALUES (?, ?, ?);",
+        ((f"session-{user_id}-{i}", user_id, expires_at - i * 86400) for user_id in range(1, users + 1) for i in range(5)),
+    )
+    conn.executemany(
+        "INSERT INTO sessions (token, user_id, expires_at) VALUES (?, ?, ?);",
+        ((ADMIN_TOKEN, 1, expires_at), (PARTNER_TOKEN, 2, expires_at)),
+    )
+    first_day = datetime.date(2024, 1, 1)
+    conn.executemany(
+        "INSERT INTO holiday (name, iso_date, template_name) VALUES (?, ?, 'holidays/christmas-modal.html');",
+        ((f"Holiday {i}", (first_day + datetime.timedelta(days=i)).isoformat()) for i in range(3 * 366)),
+    )
+    conn.commit()
+
+
+def send(client, requests: tuple):
+    for method, url, htmx, data in requests:
+        headers = {"HX-Request": "true"} if htmx else {}
+        response = client.request(method, url, headers=headers, data=data, follow_redirects=False)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {url} returned {response.status_code}")
+
+
+def crawl(path: str, log_path: str) -> list[dict]:
+    """Sends GUEST_CRAWL and CRAWL to the app against the database at `path`, sweeps expired sessions and returns the logged statements."""
+    from fastapi.testclient import TestClient
+
+    from app.core.config import get_settings
+    from app.core.connection_pool import pool
+    from app.core.profiling import profile_store
+    from app.core.slow_queries import slow_query_log
+    from app.services.session_sweeper import delete_expired_sessions
+
+    pool.close_all()
+    pool.database = path
+    slow_query_log.path = log_path
+    slow_query_log.threshold_ms = 0
+    profile_store.directory = os.path.dirname(log_path)
+    # served by the profile download route
+    open(os.path.join(profile_store.directory, CRAWL_PROFILE), "wb").close()
+
+    from main import app
+
+    send(client=TestClient(app), requests=GUEST_CRAWL)
+
+    client = TestClient(app)
+    client.cookies.set("session-id", ADMIN_TOKEN)
+    send(client=client, requests=CRAWL)
+
+    delete_expired_sessions(batch_size=get_settings().SESSION_SWEEP_BATCH_SIZE)
+
+    pool.close_all()
+
+    return slow_query_log.tail(limit=100_000)
+
+
+def uncrawled_routes() -> list[str]:
+    """Returns the routes in router.routes that no crawl request reaches."""
+    from starlette.routing import Match
+
+    from router import router
+
+    requests = [(method, url) for method, url, _, _ in GUEST_CRAWL + CRAWL]
+    missing = []
+    for route in router.routes:
+        if not any(route.matches({"type": "http", "method": method, "path": url})[0] == Match.FULL for method, url in requests):
+            missing.append(f"{'/'.join(sorted(route.methods))} {route.path}")
+
+    return missing
+
+
+def is_scan(step: str) -> bool:
+    return step.startswith("SCAN ") and step != "SCAN CONSTANT ROW"
+
+
+def check(rows: int, users: int, verbose: bool = False) -> list[str]:
+    """Crawls a seeded database, prints the statements found and returns the failures."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "plans.sqlite3")
+        build_database(path=path)
+
+        conn = sqlite3.connect(path)
+        seed(conn=conn, rows=rows, users=users)
+        seed_app_data(conn=conn, users=users)
+        conn.execute("ANALYZE;")
+        conn.close()
+
+        entries = crawl(path=path, log_path=os.path.join(directory, "queries.jsonl"))
+
+    # one entry per normalized statement, keeping the first caller seen
+    statements = {}
+    for entry in reversed(entries):
+        statements.setdefault(entry["sql"], entry)
+
+    failures = []
+    seen = set()
+    for sql, entry in statements.items():
+        scanned = [step for step in entry["plan"] if is_scan(step)]
+        hot_paths = [name for name, pattern in HOT_PATHS.items() if pattern.search(sql)]
+        seen.update(hot_paths)
+
+        if verbose:
+            print(f"{entry['caller']}\n  {sql}")
+            for step in entry["plan"]:
+                print(f"    {step}")
+
+        if scanned and hot_paths:
+            failures.append(f"{', '.join(hot_paths)} {entry['caller']}: {' / '.join(scanned)}\n  {entry['sql']}")
+        elif scanned:
+            print(f"scan (not hot path) {entry['caller']}: {' / '.join(scanned)}\n  {entry['sql']}")
+
+    print(f"{len(statements)} distinct statements from {len(GUEST_CRAWL) + len(CRAWL)} requests")
+
+    failures += [f"{name}: no statement in the crawl matches, update HOT_PATHS or CRAWL" for name in HOT_PATHS if name not in seen]
+    failures += [f"{route}: not in the crawl, add it to CRAWL or GUEST_CRAWL" for route in uncrawled_routes()]
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--verbose", action="store_true", help="print every statement and its plan")
+    args = parser.parse_args()
+
+    failures = check(rows=args.rows, users=args.users, verbose=args.verbose)
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    if failures:
+        sys.exit(1)
+
+    print("every route is crawled and hot-path statements all use an index")
+
+
+if __name__ == "__main__":
+    main()
@@ -25,12 +25,14 @@ def move_schedules():
                 row = list(row)
                 if row[3] is not None:
                     row[3] = row[3].strftime("%Y-%m-%d %H:%M:%S")
+                # month queries and the unique index read day
+                row.append(row[3][:10] if row[3] is not None else None)
                 new_rows.append(tuple(row))
 
             dest_cursor.executemany("""
                 INSERT INTO schedules (
-                    id, shift_id, user_id, date
-                ) VALUES (?, ?, ?, ?)
+                    id, shift_id, user_id, date, day
+                ) VALUES (?, ?, ?, ?, ?)
             """, new_rows)
             
             dest_conn.commit()
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""Stress one database file with concurrent writer processes, with and without busy retries.
+
+Builds a database from the yoyo migrations and starts `--processes`
+writers, each creating `--writes` shifts with Shift.create in its own
+pooled transaction, the way request handlers write. busy_timeout is set
+low (--busy-timeout-ms) so lock waits run out the way they do under a
+real pile-up of workers. Runs once with retries off and once with the
+retry policy from Settings, and prints committed writes, writes that
+failed with "database is locked", retries and throughput.
+
+--read-first reads before writing in the same transaction, like handlers
+that check ownership first. Those transactions cannot wait for the
+write lock, and execute_write restarts them with BEGIN IMMEDIATE
+(counted as restarts).
+
+--http sends the writes through the app instead: each process signs in
+as its own user and cycles through POST /shifts/new, POST
+/shifts/{id}/edit and PUT /users/{id}, which write on the request's
+get_db transaction after authenticate has read from it. Any 5xx
+response counts as failed.
+
+    python -m app.scripts.stress_writes --processes 8 --writes 300
+    python -m app.scripts.stress_writes --processes 8 --writes 100 --http
+"""
+
+import argparse
+import dataclasses
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from app.core.busy_retry import begin, busy_retry, is_busy
+from app.core.config import get_settings
+from app.core.connection_pool import ConnectionPool
+from app.core.sqlite_profile import ConnectionProfile
+from app.models.shift import Shift
+from app.scripts.bench_schedule_month import build_database, seed
+from app.scripts.check_query_plans import seed_app_data
+
+RESTART = "BEGIN IMMEDIATE restart"
+
+
+def write_loop(path: str, profile: ConnectionProfile, attempts: int, user_id: int, writes: int, read_first: bool, results):
+    busy_retry.attempts = attempts
+    pool = ConnectionPool(path, profile=profile, max_size=1)
+    committed = locked = 0
+    for i in range(writes):
+        try:
+            with pool.connection() as conn:
+                if read_first:
+                    begin(conn)
+                    conn.execute("SELECT COUNT(*) FROM shifts WHERE user_id = ?;", (user_id, )).fetchone()
+                Shift.create(conn=conn, long_name=f"Shift {i}", short_name="S", user_id=user_id)
+        except sqlite3.OperationalError as error:
+            if not is_busy(error):
+                raise
+            locked += 1
+            continue
+        committed += 1
+    pool.close_all()
+    results.put((committed, locked, busy_retry.stats()))
+
+
+def http_loop(path: str, profile: ConnectionProfile, attempts: int, user_id: int, writes: int, read_first: bool, results):
+    from fastapi.testclient import TestClient
+
+    from app.core.connection_pool import pool
+
+    busy_retry.attempts = attempts
+    pool.database = path
+    pool.profile = profile
+
+    from main import app
+
+    client = TestClient(app, raise_server_exceptions=False, follow_redirects=False)
+    # seed_app_data's newest session for the user
+    client.cookies.set("session-id", f"session-{user_id}-0")
+    requests = (
+        ("POST", "/shifts/new", {"shift_name": "Stress shift"}),
+        ("POST", f"/shifts/{user_id}/edit", {"long_name": "Day shift", "short_name": "DS"}),
+        ("PUT", f"/users/{user_id}", {"display_name": f"User {user_id}"}),
+    )
+    committed = failed = 0
+    for i in range(writes):
+        method, url, data = requests[i % len(requests)]
+        response = client.request(method, url, data=data, headers={"HX-Request": "true"})
+        if response.status_code >= 500:
+            failed += 1
+        elif response.headers.get("hx-redirect") == "/signin":
+            raise RuntimeError(f"{method} {url} was not signed in")
+        else:
+            committed += 1
+    pool.close_all()
+    results.put((committed, failed, busy_retry.stats()))
+
+
+def run(path: str, profile: ConnectionProfile, attempts: int, args) -> dict:
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=http_loop if args.http else write_loop, args=(path, profile, attempts, i + 1, args.writes, args.read_first, results))
+        for i in range(args.processes)
+    ]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    totals = {"committed": 0, "locked": 0, "retries": 0, "restarts": 0}
+    for _ in processes:
+        committed, locked, stats = results.get()
+        totals["committed"] += committed
+        totals["locked"] += locked
+        totals["retries"] += sum(operation["retries"] for operation in stats.values())
+        totals["restarts"] += stats.get(RESTART, {}).get("calls", 0)
+    for process in processes:
+        process.join()
+    totals["seconds"] = time.perf_counter() - start
+
+    return totals
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=300)
+    parser.add_argument("--busy-timeout-ms", type=int, default=5)
+    parser.add_argument("--read-first", action="store_true")
+    parser.add_argument("--http", action="store_true", help="write through the app's routes")
+    args = parser.parse_args()
+
+    profile = dataclasses.replace(ConnectionProfile.from_settings(settings), busy_timeout_ms=args.busy_timeout_ms)
+    policies = {
+        "no retries": 1,
+        f"{settings.SQLITE_RETRY_ATTEMPTS} attempts": int(settings.SQLITE_RETRY_ATTEMPTS),
+    }
+    writes = "HTTP writes" if args.http else "Shift.create"
+    print(f"{args.processes} processes x {args.writes} {writes}, busy_timeout {args.busy_timeout_ms} ms")
+    for name, attempts in policies.items():
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "stress.sqlite3")
+            build_database(path=path)
+            conn = sqlite3.connect(path)
+            seed(conn=conn, rows=0, users=args.processes)
+            seed_app_data(conn=conn, users=args.processes)
+            conn.close()
+            profile.connect(path).close()
+
+            totals = run(path=path, profile=profile, attempts=attempts, args=args)
+
+        print(
+            f"{name:12} committed {totals['committed']:6}  failed {totals['locked']:5}"
+            f"  retries {totals['retries']:5}  restarts {totals['restarts']:5}"
+            f"  {totals['committed'] / totals['seconds']:7.0f} writes/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Loads a month of schedules for the calendar month view"""
+
+from dataclasses import dataclass, field
+import datetime
+import sqlite3
+
+from app.models.commitment import Commitment
+from app.services import calendar_service
+from app.viewmodels.pages import CalendarDayCell
+
+
+@dataclass
+class MonthSchedules:
+    """A month of commitments, with their shift names, keyed by ISO day, then by shift id."""
+    commitments: dict = field(default_factory=dict)
+    bae_commitments: dict = field(default_factory=dict)
+
+
+def load_month_schedules(
+    conn: sqlite3.Connection,
+    user_id: int,
+    start_of_month: datetime.date,
+    end_of_month: datetime.date,
+) -> MonthSchedules:
+    """Returns the month's commitments for the user and their partner from one query."""
+    schedules = MonthSchedules()
+    rows = Commitment.list_month_for_user_and_partner(
+        conn=conn,
+        start_of_month=start_of_month,
+        end_of_month=end_of_month,
+        user_id=user_id,
+    )
+    for row in rows:
+        by_day = schedules.commitments if row.user_id == user_id else schedules.bae_commitments
+        by_day.setdefault(row.day, {})[row.shift_id] = row
+
+    return schedules
+
+
+def _badge(day_commitments: dict) -> str:
+    """Returns the card text for a day: the shift short name, or xN for several shifts."""
+    if not day_commitments:
+        return None
+    if len(day_commitments) > 1:
+        return f"x{len(day_commitments)}"
+
+    return next(iter(day_commitments.values())).short_name
+
+
+def build_day_cells(
+    month_grid: calendar_service.MonthGrid,
+    month_schedules: MonthSchedules,
+    open_day: int = None,
+    view_transition_day: int = None,
+) -> list[CalendarDayCell]:
+    """Returns one ready-to-render cell per grid day so the template is a straight loop."""
+    base_href = f"/calendar/{month_grid.first_day.year}/{month_grid.first_day.month}"
+    cells = []
+    for grid_day in month_grid.days:
+        day = grid_day.date.day
+        if not grid_day.in_month:
+            cells.append(CalendarDayCell(label=day, href=None, in_month=False, is_open=False, user_badge=None, bae_badge=None, transition=False))
+            continue
+
+        cells.append(CalendarDayCell(
+            label=day,
+            href=f"{base_href}/{day}",
+            in_month=True,
+            is_open=day == open_day,
+            user_badge=_badge(month_schedules.commitments.get(grid_day.iso)),
+            bae_badge=_badge(month_schedules.bae_commitments.get(grid_day.iso)),
+            transition=day == view_transition_day,
+        ))
+
+    return cells
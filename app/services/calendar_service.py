@@ -1,8 +1,12 @@
 """Functions for calendar"""
 
 import calendar
+from dataclasses import dataclass
 import datetime
 from enum import Enum
+from functools import lru_cache
+from types import MappingProxyType
+from typing import NamedTuple
 
 
 class Weekday(Enum):
@@ -38,6 +42,30 @@ MONTHS = ["January", "February", "March", "April", "May", "June",
 
 MONTH_CALENDAR = calendar.Calendar(firstweekday=6)
 
+MONTH_GRID_CACHE_SIZE = 64
+
+
+class GridDay(NamedTuple):
+    """One cell of a month grid."""
+    date: datetime.date
+    iso: str
+    weekday: Weekday
+    in_month: bool
+
+
+@dataclass(frozen=True)
+class MonthGrid:
+    """Precomputed, read only calendar grid for one month"""
+    first_day: datetime.date
+    # every cell from the first Sunday to the last Saturday
+    days: tuple[GridDay, ...]
+    # ISO key -> date for the days of the month only
+    month_dates: MappingProxyType
+    prev_month: datetime.date
+    next_month: datetime.date
+    prev_month_name: str
+    next_month_name: str
+
 
 def extract_date_string_numbers(date_string: str):
     """ Returns the year, month, and day from a date string in integer format """
@@ -106,6 +134,26 @@ def get_month_calendar(year, month):
     return MONTH_CALENDAR.itermonthdates(year, month)
 
 
+@lru_cache(maxsize=MONTH_GRID_CACHE_SIZE)
+def get_month_grid(year: int, month: int) -> MonthGrid:
+    """Returns the month grid for year/month, built once per process and shared"""
+    days = tuple(
+        GridDay(date=date, iso=date.isoformat(), weekday=Weekday(date.weekday()), in_month=date.month == month)
+        for date in MONTH_CALENDAR.itermonthdates(year, month)
+    )
+    prev_month_name, next_month_name = get_prev_and_next_month_names(current_month=month)
+
+    return MonthGrid(
+        first_day=datetime.date(year, month, 1),
+        days=days,
+        month_dates=MappingProxyType({day.iso: day.date for day in days if day.in_month}),
+        prev_month=datetime.date(year if month != 1 else year - 1, month - 1 if month != 1 else 12, 1),
+        next_month=datetime.date(year if month != 12 else year + 1, month + 1 if month != 12 else 1, 1),
+        prev_month_name=prev_month_name,
+        next_month_name=next_month_name,
+    )
+
+
 def get_month_date_list(year, month):
     """Returns a list of dates for the given month/year"""
     return MONTH_CALENDAR.itermonthdays4(year, month)
@@ -122,3 +170,10 @@ def get_end_of_month(year, month):
         return datetime.datetime(year + 1, 1, 1) + datetime.timedelta(seconds=-1)
     else:
         return datetime.datetime(year, month + 1, 1) + datetime.timedelta(seconds=-1)
+
+
+def get_days_in_range(start: datetime.date, end: datetime.date, weekdays: set[int] | None = None) -> list[datetime.date]:
+    """Returns the dates from start to end inclusive, only those on weekdays (0 is Monday) when given"""
+    days = (start + datetime.timedelta(days=offset) for offset in range((end - start).days + 1))
+
+    return [day for day in days if weekdays is None or day.weekday() in weekdays]
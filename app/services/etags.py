@@ -0,0 +1,74 @@
+"""ETags and conditional GETs for the calendar and scheduling pages"""
+
+import hashlib
+import os
+import sqlite3
+
+from fastapi import Request
+from fastapi.responses import Response
+
+TEMPLATES_DIR = "templates"
+
+
+def get_templates_version(directory: str = TEMPLATES_DIR) -> str:
+    """Returns a fingerprint of the template files so a deploy changes every ETag."""
+    digest = hashlib.blake2b(digest_size=8)
+    for root, _, files in sorted(os.walk(directory)):
+        for name in sorted(files):
+            stat = os.stat(os.path.join(root, name))
+            digest.update(f"{root}/{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+
+    return digest.hexdigest()
+
+
+TEMPLATES_VERSION = get_templates_version()
+
+
+def get_data_versions(conn: sqlite3.Connection, user_id: int) -> tuple:
+    """Returns the user's data version and header fields, their partner's id and data version and the holiday version."""
+    cursor = conn.cursor()
+    # the header shows display_name and is_admin, which the session cache does not keep
+    cursor.execute("""SELECT users.data_version, users.display_name, users.is_admin, partner.id, partner.data_version,
+                        (SELECT version FROM data_versions WHERE name = 'holiday')
+                    FROM users
+                    LEFT JOIN shares ON shares.sender_id = users.id
+                    LEFT JOIN users AS partner ON partner.id = shares.receiver_id
+                    WHERE users.id = ?
+                    LIMIT 1;
+                    """, (user_id, ))
+    row = cursor.fetchone()
+
+    return tuple(row) if row else ()
+
+
+def make_etag(conn: sqlite3.Connection, user_id: int, variant: tuple) -> str:
+    """Returns a strong ETag for the user's view of a page, `variant` being the month, open day and so on."""
+    versions = get_data_versions(conn=conn, user_id=user_id)
+    tag = repr((TEMPLATES_VERSION, user_id, versions, variant)).encode()
+
+    return f'"{hashlib.blake2b(tag, digest_size=12).hexdigest()}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Checks If-None-Match against the current ETag."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+    return "*" in tags or etag in tags
+
+
+def conditional_headers(etag: str) -> dict:
+    """Returns headers for a page served with an ETag."""
+    # no-cache revalidates every view, one small query instead of a full load and render
+    return {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Vary": "HX-Request",
+    }
+
+
+def not_modified_response(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,42 @@
+"""Background cleanup of expired sessions"""
+
+import asyncio
+import logging
+import time
+
+from app.core.config import get_settings
+from app.core.connection_pool import pool
+from app.models.session import Session
+
+settings = get_settings()
+
+
+def delete_expired_sessions(batch_size: int) -> int:
+    """Deletes one batch of expired sessions in its own short transaction."""
+    with pool.connection() as conn:
+        return Session.delete_expired(conn=conn, now=int(time.time()), batch_size=batch_size)
+
+
+async def sweep_expired_sessions(
+    batch_size: int = settings.SESSION_SWEEP_BATCH_SIZE,
+    interval: float = settings.SESSION_SWEEP_INTERVAL,
+):
+    """Deletes expired sessions every `interval` seconds."""
+    # small batches, each committed on its own in a worker thread, so the write lock is never held long
+    while True:
+        try:
+            total = 0
+            while True:
+                deleted = await asyncio.to_thread(delete_expired_sessions, batch_size)
+                total += deleted
+                if deleted < batch_size:
+                    break
+                # let other writers in between batches
+                await asyncio.sleep(0.05)
+
+            if total:
+                logging.info(f"Deleted {total} expired sessions")
+        except Exception:
+            logging.exception("Expired session sweep failed")
+
+        await asyncio.sleep(interval)
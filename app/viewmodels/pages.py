@@ -3,19 +3,33 @@ from typing import TypedDict
 
 from app.viewmodels.structs import ScheduleRow, ShiftRow, UserRow
 
+class CalendarDayCell:
+    """One card of the calendar month grid with everything it shows precomputed."""
+    __slots__ = ("label", "href", "in_month", "is_open", "user_badge", "bae_badge", "transition")
+
+    def __init__(self, label: int, href: str, in_month: bool, is_open: bool, user_badge: str, bae_badge: str, transition: bool):
+        self.label = label
+        self.href = href
+        self.in_month = in_month
+        self.is_open = is_open
+        self.user_badge = user_badge
+        self.bae_badge = bae_badge
+        self.transition = transition
+
+
 class CalendarMonthPage(TypedDict):
     current_user: UserRow
     current_month: datetime.date
     prev_month_object: datetime.date
     next_month_object: datetime.date
     days_of_week: list[str]
-    month_calendar: dict
+    day_cells: list[CalendarDayCell]
     shifts: dict
-    schedules: dict
-    bae_shifts: dict
+    commitments: dict
     bae_commitments: dict
     view_transition_day: str
     birthday_ids: list[int]
+    is_fragment: bool
 
 class ScheduleMonthPage(TypedDict):
     current_date: datetime.date
@@ -7,4 +7,5 @@ UserLoginRow = namedtuple("UserLoginRow", ("id", "display_name", "is_admin", "bi
 ShiftRow = namedtuple("ShiftRow", ("id", "long_name", "short_name"))
 ShiftCreate = namedtuple("ShiftCreate", ("long_name", "short_name", "user_id"))
 
-ScheduleRow = namedtuple("ScheduleRow", ("id", "shift_id", "user_id", "date"))
\ No newline at end of file
+ScheduleRow = namedtuple("ScheduleRow", ("id", "shift_id", "user_id", "date"))
+CommitmentShiftRow = namedtuple("CommitmentShiftRow", ("id", "shift_id", "user_id", "day", "long_name", "short_name"))
@@ -1,18 +1,20 @@
 """Main file to hold app and api routes"""
+import asyncio
 import logging
-import time
 
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from mangum import Mangum
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.middleware.base import RequestResponseEndpoint
 
 from router import router as app_router
 
 from app.core.config import get_settings
+from app.core.instrumentation import TimingMiddleware
+from app.core.middleware import GateMiddleware, ProfilerMiddleware
 from app.core.template_utils import templates
+from app.core.write_queue import write_queue
+from app.services.session_sweeper import sweep_expired_sessions
 
 
 SETTINGS = get_settings()
@@ -27,79 +29,10 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-class ClosingDownMiddleware(BaseHTTPMiddleware):
-    async def dispatch(
-            self,
-            request: Request,
-            call_next: RequestResponseEndpoint
-    ):
-        if SETTINGS.CLOSED_DOWN == "true":
-            context = {"request": request}
-            return templates.TemplateResponse(
-                request=request,
-                name="closed-down.html",
-                context=context
-            )
-
-        else:
-            response = await call_next(request)
-            return response
-        
-
-
-class MaintenanceMiddleware(BaseHTTPMiddleware):
-    async def dispatch(
-            self,
-            request: Request,
-            call_next: RequestResponseEndpoint
-    ):
-        if SETTINGS.MAINTENANCE_MODE == "true":
-            logging.info("Maintenance Mode is on")
-            # Allow `/maintenance` to bypass the maintenance check
-            if request.url.path == "/maintenance":
-                logging.info("direct access to maintenance page, allowing")
-                return await call_next(request)
-            
-            if request.headers.get("HX-Request"):      
-                logging.info("attempted hx-request access to resource, redirecting to maintenance page")
-                response = templates.TemplateResponse(
-                    "maintenance.html",
-                    {"request": request}
-                )
-                response.headers["HX-Redirect"] = "/maintenance"
-                return response
-            
-            logging.info("attempted non-hx access to resource, redirecting to maintenance page")
-            return RedirectResponse(url="/maintenance")
-        else:
-            logging.info("Maintenance Mode is off")
-            if request.url.path == "/maintenance":
-                logging.info("attempted access to maintenance page, redirecting to home")
-                return RedirectResponse(url="/")
-            
-            logging.info("attempted access to resource, allowing")
-            response = await call_next(request)
-            return response
-
-
-class SleepMiddleware:
-    """Middleware to sleep for 3 seconds in development environment
-    used when developing and testing loading states"""
-
-    def __init__(self, app):
-        self.app = app
-
-    async def __call__(self, scope, receive, send):
-        if SETTINGS.ENVIRONMENT == "dev":
-            print(
-                f"development environment detecting, sleeping for {SETTINGS.SLEEP_TIME} seconds")
-            time.sleep(SETTINGS.SLEEP_TIME)  # Delay for 3000ms (3 seconds)
-        await self.app(scope, receive, send)
-
-
-app.add_middleware(SleepMiddleware)
-app.add_middleware(ClosingDownMiddleware)
-app.add_middleware(MaintenanceMiddleware)
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(GateMiddleware)
+# outermost, so gated responses are timed too
+app.add_middleware(TimingMiddleware)
 
 # app.include_router(chat_router.router)
 # app.include_router(onboard_router.router)
@@ -109,6 +42,23 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 handler = Mangum(app)
 
 
+@app.on_event("startup")
+async def start_session_sweeper():
+    """Starts the background task that deletes expired sessions"""
+    app.state.session_sweeper = asyncio.create_task(sweep_expired_sessions())
+
+
+@app.on_event("shutdown")
+async def stop_session_sweeper():
+    app.state.session_sweeper.cancel()
+
+
+@app.on_event("shutdown")
+def stop_write_queue():
+    """Commits queued writes before the worker exits"""
+    write_queue.close()
+
+
 
 @app.exception_handler(404)
 async def custom_404_handler(request, __):
@@ -0,0 +1,12 @@
+"""
+Add sessions expires_at index
+"""
+
+from yoyo import step
+
+__depends__ = {'20251230_01_WerbO-add-script-name-to-holiday'}
+
+steps = [
+    step("CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at);",
+    "DROP INDEX IF EXISTS idx_sessions_expires_at;")
+]
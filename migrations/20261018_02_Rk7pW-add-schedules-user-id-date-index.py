@@ -0,0 +1,12 @@
+"""
+Add schedules user_id date index
+"""
+
+from yoyo import step
+
+__depends__ = {'20261018_01_hN3tQ-add-sessions-expires-at-index'}
+
+steps = [
+    step("CREATE INDEX IF NOT EXISTS idx_schedules_user_id_date ON schedules (user_id, date);",
+    "DROP INDEX IF EXISTS idx_schedules_user_id_date;")
+]
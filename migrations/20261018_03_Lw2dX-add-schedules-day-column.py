@@ -0,0 +1,40 @@
+"""
+Add schedules day column
+"""
+
+from yoyo import step
+
+__depends__ = {'20261018_02_Rk7pW-add-schedules-user-id-date-index'}
+
+# the backfill commits batch by batch so it can run against the live
+# database, and picks up where it stopped if it is interrupted
+__transactional__ = False
+
+BATCH_SIZE = 5000
+
+
+def add_day_column(conn):
+    cursor = conn.cursor()
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(schedules);").fetchall()]
+    if "day" not in columns:
+        cursor.execute("ALTER TABLE schedules ADD COLUMN day TEXT;")
+
+
+def backfill_day_column(conn):
+    cursor = conn.cursor()
+    max_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM schedules;").fetchone()[0]
+    for start_id in range(0, max_id + 1, BATCH_SIZE):
+        cursor.execute("""
+            UPDATE schedules SET day = substr(date, 1, 10)
+            WHERE id >= ? AND id < ? AND day IS NULL;
+            """, (start_id, start_id + BATCH_SIZE))
+
+
+steps = [
+    step(add_day_column, "ALTER TABLE schedules DROP COLUMN day;"),
+    step(backfill_day_column),
+    step("CREATE INDEX IF NOT EXISTS idx_schedules_user_id_day ON schedules (user_id, day);",
+    "DROP INDEX IF EXISTS idx_schedules_user_id_day;"),
+    step("DROP INDEX IF EXISTS idx_schedules_user_id_date;",
+    "CREATE INDEX IF NOT EXISTS idx_schedules_user_id_date ON schedules (user_id, date);"),
+]
@@ -0,0 +1,12 @@
+"""
+Add users data version
+"""
+
+from yoyo import step
+
+__depends__ = {'20261018_03_Lw2dX-add-schedules-day-column'}
+
+steps = [
+    step("ALTER TABLE users ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0;",
+    "ALTER TABLE users DROP COLUMN data_version;")
+]
@@ -0,0 +1,18 @@
+"""
+Create runtime flags table
+"""
+
+from yoyo import step
+
+__depends__ = {'20261018_04_Tq8vB-add-users-data-version'}
+
+steps = [
+    step("""
+        CREATE TABLE IF NOT EXISTS runtime_flags (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL
+        );
+    """,
+    "DROP TABLE IF EXISTS runtime_flags;")
+]
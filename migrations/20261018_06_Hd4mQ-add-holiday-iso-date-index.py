@@ -0,0 +1,12 @@
+"""
+Add holiday iso_date index
+"""
+
+from yoyo import step
+
+__depends__ = {'20261018_05_Fp3kZ-create-runtime-flags-table'}
+
+steps = [
+    step("CREATE INDEX IF NOT EXISTS idx_holiday_iso_date ON holiday (iso_date);",
+    "DROP INDEX IF EXISTS idx_holiday_iso_date;")
+]
@@ -0,0 +1,12 @@
+"""
+Add shifts user_id index
+"""
+
+from yoyo import step
+
+__depends__ = {'20261018_06_Hd4mQ-add-holiday-iso-date-index'}
+
+steps = [
+    step("CREATE INDEX IF NOT EXISTS idx_shifts_user_id ON shifts (user_id);",
+    "DROP INDEX IF EXISTS idx_shifts_user_id;")
+]
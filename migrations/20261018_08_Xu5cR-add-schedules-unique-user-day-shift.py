@@ -0,0 +1,23 @@
+"""
+Add schedules unique user, day, shift index
+"""
+
+from yoyo import step
+
+__depends__ = {'20261018_07_Sf8nW-add-shifts-user-id-index'}
+
+# double submits stored the same commitment more than once, the oldest copy is kept.
+# Rows written by code older than the day column since its backfill are
+# filled in first, so NULL days are not grouped together and deleted.
+# The unique index leads with (user_id, day) so it also serves the month
+# queries and replaces idx_schedules_user_id_day.
+steps = [
+    step("UPDATE schedules SET day = substr(date, 1, 10) WHERE day IS NULL;"),
+    step("""DELETE FROM schedules WHERE id NOT IN (
+            SELECT MIN(id) FROM schedules WHERE day IS NOT NULL GROUP BY user_id, day, shift_id
+        ) AND day IS NOT NULL;"""),
+    step("CREATE UNIQUE INDEX IF NOT EXISTS idx_schedules_user_id_day_shift_id ON schedules (user_id, day, shift_id);",
+    "DROP INDEX IF EXISTS idx_schedules_user_id_day_shift_id;"),
+    step("DROP INDEX IF EXISTS idx_schedules_user_id_day;",
+    "CREATE INDEX IF NOT EXISTS idx_schedules_user_id_day ON schedules (user_id, day);"),
+]
@@ -0,0 +1,33 @@
+"""
+Add holiday data version
+"""
+
+from yoyo import step
+
+__depends__ = {'20261018_08_Xu5cR-add-schedules-unique-user-day-shift'}
+
+# holidays and their messages are written outside the app, so triggers
+# bump the version that calendar and scheduling ETags are built from
+HOLIDAY_TABLES = ("holiday", "holiday_message")
+EVENTS = ("INSERT", "UPDATE", "DELETE")
+
+steps = [
+    step("""
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        );
+    """,
+    "DROP TABLE IF EXISTS data_versions;"),
+    step("INSERT OR IGNORE INTO data_versions (name) VALUES ('holiday');"),
+    *(
+        step(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_data_version AFTER {event} ON {table}
+            BEGIN
+                UPDATE data_versions SET version = version + 1 WHERE name = 'holiday';
+            END;
+        """,
+        f"DROP TRIGGER IF EXISTS {table}_{event.lower()}_data_version;")
+        for table in HOLIDAY_TABLES for event in EVENTS
+    ),
+]
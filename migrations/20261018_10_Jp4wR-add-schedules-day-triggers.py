@@ -0,0 +1,32 @@
+"""
+Add schedules day triggers
+"""
+
+from yoyo import step
+
+__depends__ = {'20261018_09_Vb6nT-add-holiday-data-version'}
+
+# month queries and the unique (user_id, day, shift_id) index read day, so
+# triggers fill it in for writers that only set date. Rows written that way
+# since migration 08 are filled in first, and the ones left NULL duplicate
+# a commitment that already exists.
+steps = [
+    step("UPDATE OR IGNORE schedules SET day = substr(date, 1, 10) WHERE day IS NULL;"),
+    step("DELETE FROM schedules WHERE day IS NULL;"),
+    step("""
+        CREATE TRIGGER IF NOT EXISTS schedules_insert_day AFTER INSERT ON schedules
+        WHEN NEW.day IS NOT substr(NEW.date, 1, 10)
+        BEGIN
+            UPDATE schedules SET day = substr(NEW.date, 1, 10) WHERE id = NEW.id;
+        END;
+    """,
+    "DROP TRIGGER IF EXISTS schedules_insert_day;"),
+    step("""
+        CREATE TRIGGER IF NOT EXISTS schedules_update_day AFTER UPDATE OF date, day ON schedules
+        WHEN NEW.day IS NOT substr(NEW.date, 1, 10)
+        BEGIN
+            UPDATE schedules SET day = substr(NEW.date, 1, 10) WHERE id = NEW.id;
+        END;
+    """,
+    "DROP TRIGGER IF EXISTS schedules_update_day;"),
+]
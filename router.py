@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends
 
 from app.auth import auth_service
+from app.core.profiling import profiled
 from app.controllers import admin, auth, calendar, public, relationships, schedule, shifts , users
-from app.dependencies import requires_admin, requires_profile_owner, requires_schedule_owner, requires_guest, requires_shift_owner, requires_user
+from app.dependencies import requires_admin, requires_profile_owner, requires_guest, requires_shift_owner, requires_user
 
 router = APIRouter()
 
@@ -34,7 +35,8 @@ routes = [
     ("GET",     "/scheduling",                          schedule.index,             requires_user),   # user
     ("GET",     "/scheduling/{year}/{month}",           schedule.month,             requires_user),   # user
     ("POST",    "/scheduling",                          schedule.create,            requires_user),   # user
-    ("DELETE",  "/scheduling/{schedule_id}",            schedule.delete,            requires_schedule_owner),   # owner?
+    ("POST",    "/scheduling/many",                     schedule.create_many,       requires_user),   # user
+    ("DELETE",  "/scheduling/{schedule_id}",            schedule.delete,            requires_user),   # owner, checked by the delete
 
 
     ("GET",     "/profile",                             users.profile,              requires_user),   # user
@@ -47,14 +49,20 @@ routes = [
     # ("POST",    "/search",                              relationships.search,       auth_service.user_dependency),   # user?
 
     ("GET",     "/admin",                               admin.index,                requires_admin),
+    ("POST",    "/admin/flags/{name}",                  admin.update_flag,          requires_admin),
     ("GET",     "/admin/users",                         admin.users,                requires_admin),
     ("GET",     "/admin/signins",                       admin.signins,              requires_admin),
+    ("GET",     "/admin/metrics",                       admin.metrics,              requires_admin),
+    ("GET",     "/admin/slow-queries",                  admin.slow_queries,         requires_admin),
+    ("GET",     "/admin/profiles",                      admin.profiles,             requires_admin),
+    ("POST",    "/admin/profiles/cookie",               admin.update_profile_cookie, requires_admin),
+    ("GET",     "/admin/profiles/{name}",               admin.download_profile,     requires_admin),
 ]
 
 for method, path, handler, _ in routes:
     router.add_api_route(
         path=path,
-        endpoint=handler,
+        endpoint=profiled(handler),
         methods=[method],
     )
 
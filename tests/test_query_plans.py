@@ -0,0 +1,7 @@
+"""Query plans of the statements the app runs, see app/scripts/check_query_plans.py"""
+
+from app.scripts import check_query_plans
+
+
+def test_every_route_is_crawled_and_hot_paths_use_an_index():
+    assert check_query_plans.check(rows=20_000, users=200) == []